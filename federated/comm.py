@@ -1,12 +1,15 @@
 from pathlib import Path
 from argparse import ArgumentParser
 from simulate import run_simulation
+from core import NetworkModel
 import matplotlib.pyplot as plt
 
 
-def main(power, dataset, feature):
+def main(power, dataset, feature, latency, bandwidth, jitter):
+    network = NetworkModel(latency, bandwidth, jitter, rng=0)
     n_points = [2**i for i in range(11)]
     n_rounds = []
+    pred_time = []
 
     for nps in n_points:
         results = run_simulation(
@@ -22,6 +25,11 @@ def main(power, dataset, feature):
             print_output=0,
         )
         n_rounds.append(results[0][2])
+        pred_time.append(network.predict(results[0][3]))
+        print(
+            f"grid n_points: {nps}, n_rounds: {n_rounds[-1]}, "
+            f"predicted time: {pred_time[-1]:.3f}s"
+        )
 
     base_results = run_simulation(
         power=power,
@@ -36,20 +44,92 @@ def main(power, dataset, feature):
         print_output=0,
     )
     base_n_rounds = base_results[0][2]
+    base_pred_time = network.predict(base_results[0][3])
+    print(f"brent n_rounds: {base_n_rounds}, predicted time: {base_pred_time:.3f}s")
+
+    spec_results = run_simulation(
+        power=power,
+        dataset=dataset,
+        feature=feature,
+        var_comp="pairwise",
+        optimize="speculative",
+        n_points=1,  # not used in speculative
+        n_clients=100,
+        full_output=1,
+        n_reps=1,
+        print_output=0,
+    )
+    spec_n_rounds = spec_results[0][2]
+    spec_pred_time = network.predict(spec_results[0][3])
+    print(
+        f"speculative brent n_rounds: {spec_n_rounds}, "
+        f"predicted time: {spec_pred_time:.3f}s"
+    )
+
+    newton_results = run_simulation(
+        power=power,
+        dataset=dataset,
+        feature=feature,
+        var_comp="pairwise",  # not used in newton
+        optimize="newton",
+        n_points=1,  # not used in newton
+        n_clients=100,
+        full_output=1,
+        n_reps=1,
+        print_output=0,
+    )
+    newton_n_rounds = newton_results[0][2]
+    newton_pred_time = network.predict(newton_results[0][3])
+    print(
+        f"newton n_rounds: {newton_n_rounds}, "
+        f"predicted time: {newton_pred_time:.3f}s"
+    )
+
+    sketch_results = run_simulation(
+        power=power,
+        dataset=dataset,
+        feature=feature,
+        var_comp="pairwise",  # not used in sketch
+        optimize="sketch",
+        n_points=1,  # not used in sketch
+        n_clients=100,
+        full_output=1,
+        n_reps=1,
+        print_output=0,
+        refine=1,
+    )
+    sketch_n_rounds = sketch_results[0][2]
+    sketch_pred_time = network.predict(sketch_results[0][3])
+    print(
+        f"sketch (refined) n_rounds: {sketch_n_rounds}, "
+        f"predicted time: {sketch_pred_time:.3f}s"
+    )
 
-    fig, ax = plt.subplots(figsize=(3, 3))
+    fig, (ax, ax_time) = plt.subplots(1, 2, figsize=(6, 3))
 
     ax.loglog(n_points, n_rounds, marker="o", label="Grid Search")
     ax.axhline(base_n_rounds, linestyle="--", color="r", label="Brent")
+    ax.axhline(spec_n_rounds, linestyle="--", color="c", label="Speculative")
+    ax.axhline(newton_n_rounds, linestyle=":", color="g", label="Newton")
+    ax.axhline(sketch_n_rounds, linestyle="-.", color="m", label="Sketch")
     ax.set_xlabel("Number of points in grid")
     ax.set_ylabel("Number of rounds")
     ax.legend()
     ax.grid()
 
+    ax_time.loglog(n_points, pred_time, marker="o", label="Grid Search")
+    ax_time.axhline(base_pred_time, linestyle="--", color="r", label="Brent")
+    ax_time.axhline(spec_pred_time, linestyle="--", color="c", label="Speculative")
+    ax_time.axhline(newton_pred_time, linestyle=":", color="g", label="Newton")
+    ax_time.axhline(sketch_pred_time, linestyle="-.", color="m", label="Sketch")
+    ax_time.set_xlabel("Number of points in grid")
+    ax_time.set_ylabel("Predicted time (s)")
+    ax_time.grid()
+
     if power == "boxcox":
-        ax.set_title(f"{dataset.title()}: {feature} (BC)")
+        fig.suptitle(f"{dataset.title()}: {feature} (BC)")
     else:
-        ax.set_title(f"{dataset.title()}: {feature} (YJ)")
+        fig.suptitle(f"{dataset.title()}: {feature} (YJ)")
 
     PROJECT_ROOT = Path(__file__).parent.parent
     img_path = PROJECT_ROOT / f"img/federated/{power}-{dataset}-{feature}.pdf"
@@ -80,6 +160,22 @@ if __name__ == "__main__":
     parser.add_argument(
         "--feature", type=str, default="0", help="Feature index or name"
     )
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="One-way latency in seconds"
+    )
+    parser.add_argument(
+        "--bandwidth", type=float, default=1e7, help="Bandwidth in bytes per second"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0.0, help="Mean jitter per message in seconds"
+    )
     args = parser.parse_args()
 
-    main(args.power, args.dataset, args.feature)
+    main(
+        args.power,
+        args.dataset,
+        args.feature,
+        args.latency,
+        args.bandwidth,
+        args.jitter,
+    )
@@ -1,3 +1,14 @@
-from .client import FedPowerClient
-from .server import FedPowerServer
+from .client import FedPowerClient, FedPowerMultiClient
+from .server import FedPowerServer, FedPowerMultiServer
+from .edge import EdgeAggregator
 from .utils import IID_partitioner
+from .backend import (
+    SerialBackend,
+    ThreadBackend,
+    ProcessBackend,
+    AsyncioBackend,
+    get_backend,
+)
+from .transport import RemoteClient, LocalNetwork, serve_client
+from .network import NetworkModel
+from .codec import Compression
@@ -0,0 +1,265 @@
+# Execution backends for the server's fan-out to clients. A backend maps
+# client.llf(lmb, var_comp) over the clients and returns the responses and
+# the time spent in each call in client order, so aggregation is
+# deterministic whatever the completion order. With a timeout, clients that
+# have not answered in time get a None response and a NaN time. A compression
+# is passed on to client.llf when given.
+
+import asyncio
+import threading
+import time
+import multiprocessing as mp
+from multiprocessing.connection import wait as wait_conns
+from concurrent.futures import ThreadPoolExecutor, wait
+import numpy as np
+
+_LATE = (None, np.nan)
+
+
+def _timed_llf(client, lmb, var_comp, compression=None):
+    start = time.perf_counter()
+    if compression is None:
+        response = client.llf(lmb, var_comp=var_comp)
+    else:
+        response = client.llf(lmb, var_comp=var_comp, compression=compression)
+    return response, time.perf_counter() - start
+
+
+def _unzip(results):
+    return [r for r, _ in results], [t for _, t in results]
+
+
+class SerialBackend:
+    # One client after the other in the calling thread. The clients stand for
+    # parallel silos, a call is late when it alone takes more than timeout
+
+    def map(self, clients, lmb, var_comp, timeout=None, compression=None):
+        results = [_timed_llf(client, lmb, var_comp, compression) for client in clients]
+        if timeout is not None:
+            results = [_LATE if t > timeout else (r, t) for r, t in results]
+        return _unzip(results)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ThreadBackend(SerialBackend):
+    # Clients run in a thread pool, numpy releases the GIL in most kernels.
+    # A client still busy with a late call is late again without a new call
+
+    def __init__(self, n_workers=None):
+        self.n_workers = n_workers
+        self._pool = None
+        self._busy = {}
+
+    def map(self, clients, lmb, var_comp, timeout=None, compression=None):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(self.n_workers)
+        self._busy = {c: f for c, f in self._busy.items() if not f.done()}
+
+        futures = [
+            (
+                None
+                if client in self._busy
+                else self._pool.submit(_timed_llf, client, lmb, var_comp, compression)
+            )
+            for client in clients
+        ]
+        done, not_done = wait([f for f in futures if f is not None], timeout)
+        for client, future in zip(clients, futures):
+            if future in not_done and not future.cancel():
+                self._busy[client] = future
+
+        return _unzip([f.result() if f in done else _LATE for f in futures])
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+        self._busy = {}
+
+
+def _serve(conn, clients):
+    # Worker loop of ProcessBackend, holds its clients between rounds. Each
+    # call runs in its own thread and answers with the round id, so a late
+    # call does not hold up the other clients of the worker. A client still
+    # busy with a late call is late again without a new call
+    lock = threading.Lock()
+    busy = set()  # clients with a call running
+
+    def _answer(round_id, i, request):
+        try:
+            result = _timed_llf(clients[i], *request)
+        except Exception as e:
+            result = e
+        with lock:
+            busy.discard(i)
+            try:
+                conn.send((round_id, i, result))
+            except (OSError, ValueError):
+                pass  # the backend was closed meanwhile
+
+    while True:
+        request = conn.recv()
+        if request is None:
+            break
+        round_id, index, *request = request
+        with lock:
+            index = [i for i in index if i not in busy]
+            busy.update(index)
+        for i in index:
+            threading.Thread(
+                target=_answer, args=(round_id, i, request), daemon=True
+            ).start()
+    with lock:
+        conn.close()
+
+
+class ProcessBackend(SerialBackend):
+    # Clients are pinned round-robin to worker processes that keep their data,
+    # only lambdas and responses cross process boundaries in each round. A
+    # worker runs the calls of its clients concurrently, so only the late
+    # client is late. Answers of a past round that arrive late are dropped
+
+    def __init__(self, n_workers=None):
+        self.n_workers = n_workers
+        self._clients = None
+        self._workers = []
+        self._round_id = 0
+
+    def _start(self, clients):
+        self.close()
+        n_workers = min(self.n_workers or mp.cpu_count(), len(clients))
+        for k in range(n_workers):
+            conn, child = mp.Pipe()
+            proc = mp.Process(
+                target=_serve, args=(child, clients[k::n_workers]), daemon=True
+            )
+            proc.start()
+            child.close()
+            self._workers.append((proc, conn))
+        self._clients = list(clients)
+
+    def map(self, clients, lmb, var_comp, timeout=None, compression=None):
+        # Any subset of the pinned clients is served without a restart
+        position = {id(c): j for j, c in enumerate(self._clients or [])}
+        if not all(id(client) in position for client in clients):
+            self._start(clients)
+            position = {id(c): j for j, c in enumerate(self._clients)}
+
+        n_workers = len(self._workers)
+        order = {position[id(client)]: j for j, client in enumerate(clients)}
+        self._round_id += 1
+        for k, (_, conn) in enumerate(self._workers):
+            index = [j // n_workers for j in sorted(order) if j % n_workers == k]
+            if index:
+                conn.send((self._round_id, index, lmb, var_comp, compression))
+
+        worker = {conn: k for k, (_, conn) in enumerate(self._workers)}
+        results = [_LATE] * len(clients)
+        n_pending = len(clients)
+        end = None if timeout is None else time.monotonic() + timeout
+        while n_pending > 0:
+            remaining = None if end is None else max(end - time.monotonic(), 0)
+            ready = wait_conns(list(worker), remaining)
+            if not ready:
+                break
+            for conn in ready:
+                round_id, i, result = conn.recv()
+                if round_id != self._round_id:
+                    continue
+                if isinstance(result, Exception):
+                    raise result
+                results[order[worker[conn] + i * n_workers]] = result
+                n_pending -= 1
+        return _unzip(results)
+
+    def close(self):
+        for proc, conn in self._workers:
+            conn.send(None)
+            conn.close()
+            proc.join()
+        self._workers = []
+        self._clients = None
+
+
+class AsyncioBackend(SerialBackend):
+    # Clients are awaited concurrently in one event loop kept across rounds.
+    # Remote clients provide a coroutine allf(lmb, var_comp, compression) and
+    # keep their connection in that loop, a late remote call is cancelled and
+    # reconnects next time. Local clients run in threads that a late call
+    # does not hold up
+
+    def __init__(self):
+        self._pool = None
+        self._loop = None
+        self._remote = {}  # id: remote clients connected in self._loop
+
+    async def amap(self, clients, lmb, var_comp, timeout=None, compression=None):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor()
+        loop = asyncio.get_running_loop()
+
+        async def _call(client):
+            if hasattr(client, "allf"):
+                self._remote[id(client)] = client
+                start = time.perf_counter()
+                response = await client.allf(lmb, var_comp, compression)
+                return response, time.perf_counter() - start
+            return await loop.run_in_executor(
+                self._pool, _timed_llf, client, lmb, var_comp, compression
+            )
+
+        tasks = [asyncio.ensure_future(_call(client)) for client in clients]
+        if not tasks:
+            return [], []
+        done, not_done = await asyncio.wait(tasks, timeout=timeout)
+        for task in not_done:
+            task.cancel()
+        if not_done:
+            # Let the cancelled calls close their connections
+            await asyncio.wait(not_done)
+        return _unzip([t.result() if t in done else _LATE for t in tasks])
+
+    def map(self, clients, lmb, var_comp, timeout=None, compression=None):
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        return self._loop.run_until_complete(
+            self.amap(clients, lmb, var_comp, timeout, compression)
+        )
+
+    def close(self):
+        for client in self._remote.values():
+            client.close()
+        self._remote = {}
+        if self._loop is not None:
+            self._loop.close()
+            self._loop = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+_BACKENDS = {
+    "serial": SerialBackend,
+    "thread": ThreadBackend,
+    "process": ProcessBackend,
+    "asyncio": AsyncioBackend,
+}
+
+
+def get_backend(backend="serial", n_workers=None):
+    # Backend instance from its name, instances are returned as they are
+    if not isinstance(backend, str):
+        return backend
+    if backend not in _BACKENDS:
+        raise ValueError(f"backend must be one of {list(_BACKENDS)}")
+    if backend in ("serial", "asyncio"):
+        return _BACKENDS[backend]()
+    return _BACKENDS[backend](n_workers)
@@ -1,5 +1,9 @@
 import numpy as np
 from scipy.special import logsumexp, log1p
+from numerical.optimize.utils import _log_sum, _log_moments, _log_merge, _gen_lmb_slices
+from numerical.optimize.prepared import _split_zeros, _power_logabs, _h_scaled
+from .codec import quantize_response
+from .sketch import log_sketch, _MAX_BINS
 
 
 class FedPowerClient:
@@ -7,126 +11,295 @@ class FedPowerClient:
     def __init__(self, power, x):
         self.power = power
 
+        # x may be scipy.sparse, exact zeros are only counted
+        x, _, self.n_zero = _split_zeros(x)
         x = np.asarray(x, np.float64)
         x = x[~np.isnan(x)]
 
-        if self.power == "boxcox" and np.any(x <= 0):
+        if self.power == "boxcox" and (self.n_zero > 0 or np.any(x <= 0)):
             raise ValueError("x must be strictly positive for boxcox")
         self.x = x
 
-        # Cache n and the constant term
-        self.n = len(x)
-        if self.power == "yeojohnson":
-            pos = x >= 0
-            self.n_pos = np.sum(pos)
-            self.n_neg = self.n - self.n_pos
-
+        # Cache n, the constant term and the logs shared by all lambdas,
+        # zeros count as positive
+        self.n = len(x) + self.n_zero
         if self.power == "boxcox":
-            self.c = np.sum(np.log(x))
+            self.logx = np.log(x)
+            self.c = np.sum(self.logx)
         elif self.power == "yeojohnson":
-            self.c = np.sum(np.sign(x) * log1p(np.abs(x)))
+            pos = x > 0
+            self.log1p_pos = log1p(x[pos])
+            self.log1p_neg = log1p(-x[~pos])
+            self.n_pos = len(self.log1p_pos) + self.n_zero
+            self.n_neg = len(self.log1p_neg)
+            self.c = np.sum(self.log1p_pos) - np.sum(self.log1p_neg)
 
     def log_boxcox(self, lmb):
-        logx = np.log(self.x)
+        # log|psi| and sign(psi) with one row per lmb, sign is None when psi > 0
+        lmb = np.atleast_1d(lmb)
+        eq_0 = abs(lmb) < np.spacing(1.0)
 
-        if abs(lmb) < np.spacing(1.0):
-            with np.errstate(divide="ignore"):
-                logbc = np.log(logx + 0j)
-        else:  # lmb != 0
-            # - np.log(abs(lmb)) is computed at server side
-            logbc = lmb * logx
+        # - np.log(abs(lmb)) is computed at server side
+        logpsi = lmb[:, None] * self.logx
+        if not np.any(eq_0):
+            return logpsi, None
 
-        return logbc
+        with np.errstate(divide="ignore"):
+            logpsi[eq_0] = np.log(np.abs(self.logx))
+        sign = np.ones_like(logpsi)
+        sign[eq_0] = np.sign(self.logx)
+        return logpsi, sign
 
     def log_yeojohnson(self, lmb):
+        # log|psi| and sign(psi) with one row per lmb, sign is None when psi > 0
+        lmb = np.atleast_1d(lmb)
+
         if self.n_neg == 0:  # all positive
-            if abs(lmb) < np.spacing(1.0):
+            eq_0 = abs(lmb) < np.spacing(1.0)
+            logpsi = lmb[:, None] * self.log1p_pos
+            if np.any(eq_0):
                 with np.errstate(divide="ignore"):
-                    logyj = np.log(log1p(self.x) + 0j)
-            else:  # lmb != 0
-                logyj = lmb * log1p(self.x)
+                    logpsi[eq_0] = np.log(self.log1p_pos)
+            return logpsi, None
 
         elif self.n_pos == 0:  # all negative
-            if abs(lmb - 2) < np.spacing(1.0):
-                logyj = np.log(-log1p(-self.x) + 0j)
-            else:  # lmb != 2
-                logyj = (2 - lmb) * log1p(-self.x)
+            eq_2 = abs(lmb - 2) < np.spacing(1.0)
+            logpsi = (2 - lmb[:, None]) * self.log1p_neg
+            if not np.any(eq_2):
+                return logpsi, None
+
+            logpsi[eq_2] = np.log(self.log1p_neg)
+            sign = np.ones_like(logpsi)
+            sign[eq_2] = -1.0
+            return logpsi, sign
 
         else:  # mixed positive and negative
-            logyj = np.zeros_like(self.x, dtype=np.complex128)
-            pos = self.x >= 0  # binary mask
+            lmb_col = lmb[:, None]
+            logpsi = np.concatenate(
+                [
+                    _power_logabs(lmb_col, self.log1p_pos),
+                    _power_logabs(2 - lmb_col, self.log1p_neg),
+                ],
+                axis=1,
+            )
+            sign = np.concatenate(
+                [np.ones_like(self.log1p_pos), -np.ones_like(self.log1p_neg)]
+            )
+            return logpsi, np.broadcast_to(sign, logpsi.shape)
 
-            # x >= 0
-            if abs(lmb) < np.spacing(1.0):
-                with np.errstate(divide="ignore"):
-                    logyj[pos] = np.log(log1p(self.x[pos]) + 0j)
-            else:  # lmbda != 0
-                logm1_pos = np.full_like(self.x[pos], np.pi * 1j, dtype=np.complex128)
-                logyj[pos] = logsumexp(
-                    [lmb * log1p(self.x[pos]), logm1_pos], axis=0
-                ) - np.log(lmb + 0j)
-
-            # x < 0
-            if abs(lmb - 2) < np.spacing(1.0):
-                logyj[~pos] = np.log(-log1p(-self.x[~pos]) + 0j)
-            else:  # lmbda != 2
-                logm1_neg = np.full_like(self.x[~pos], np.pi * 1j, dtype=np.complex128)
-                logyj[~pos] = logsumexp(
-                    [(2 - lmb) * log1p(-self.x[~pos]), logm1_neg], axis=0
-                ) - np.log(lmb - 2 + 0j)
-
-        return logyj
-
-    def naive_variance(self, logx):
-        # log of sum(x) and log of sum(x^2)
-        logsum = logsumexp(logx)
-        with np.errstate(invalid="ignore"):
-            logsumsq = np.real(logsumexp(2 * logx))
+    def log_zero(self, lmb):
+        # log|psi| of the zeros, psi = 1 for the exp(lmb * log1p(x))
+        # sent by all positive clients, otherwise psi = 0
+        lmb = np.atleast_1d(lmb)
+        if self.power == "yeojohnson" and self.n_neg == 0:
+            return np.where(abs(lmb) < np.spacing(1.0), -np.inf, 0.0)
+        return np.full(lmb.shape, -np.inf)
+
+    def naive_variance(self, logx, sign=None, logzero=-np.inf):
+        # log of sum(x) and log of sum(x^2) along the last axis,
+        # the zeros add n_zero * exp(logzero)
+        logsum, ssum = _log_sum(logx, sign, axis=-1)
+        logsumsq = logsumexp(2 * logx, axis=-1)
+        if self.n_zero > 0:
+            logsum = np.logaddexp(logsum, np.log(self.n_zero) + logzero)
+            logsumsq = np.logaddexp(logsumsq, np.log(self.n_zero) + 2 * logzero)
+        if sign is not None:
+            # the sign of sum(x) is sent as a complex phase
+            logsum = logsum + np.pi * 1j * (ssum < 0)
         return logsum, logsumsq
 
-    def pairwise_variance(self, logx):
-        # log of mean(x) and log of sum of (x-mean(x))^2
-        # use two-pass method at client side
-        logmean = logsumexp(logx) - np.log(self.n)
-        pij = np.full_like(logx, np.pi * 1j, dtype=np.complex128)
-        logxmu = logsumexp([logx, logmean + pij], axis=0)
-        logM2 = np.real(logsumexp(2 * logxmu, axis=0))
+    def pairwise_variance(self, logx, sign=None, logzero=-np.inf):
+        # log of mean(x) and log of sum of (x-mean(x))^2 along the last axis
+        # use two-pass method at client side, then merge the zeros as one block
+        if logx.shape[-1] == 0:  # only zeros
+            logmean = np.broadcast_to(logzero, logx.shape[:-1])
+            smean = np.ones_like(logmean)
+            logM2 = np.full_like(logmean, -np.inf)
+        else:
+            logmean, smean, logM2 = _log_moments(logx, sign, axis=-1)
+            if self.n_zero > 0:
+                _, logmean, smean, logM2 = _log_merge(
+                    logx.shape[-1],
+                    logmean,
+                    smean,
+                    logM2,
+                    self.n_zero,
+                    logzero,
+                    1,
+                    -np.inf,
+                )
+        if sign is not None:
+            # the sign of mean(x) is sent as a complex phase
+            logmean = logmean + np.pi * 1j * (smean < 0)
         return logmean, logM2
 
+    def _dstats(self, lmb):
+        # Derivative statistics for a 1D chunk of lambdas: the log scale M and
+        # the scaled means of g, g', g'' and centered sums S_gg, S_gg',
+        # S_g'g' + S_gg'' (as in _power_dllf) with one row per lmb. Data with
+        # one sign are shifted to delta = logx - shift, g = delta * h0(t * delta)
+        # with t = lmb (t = 2 - lmb for negative data), mixed data are not
+        lmb = lmb[:, None]
+        if self.power == "boxcox" or self.n_neg == 0:
+            logx = self.logx if self.power == "boxcox" else self.log1p_pos
+            t, w = lmb, None
+            if self.n_zero > 0:  # zeros as one entry weighted by their count
+                logx = np.append(logx, 0.0)
+                w = np.append(np.ones(len(logx) - 1), self.n_zero)
+        elif self.n_pos == 0:
+            logx, t, w = self.log1p_neg, 2 - lmb, None
+
+        if self.power == "boxcox" or self.n_neg == 0 or self.n_pos == 0:
+            shift = (np.min(logx) + np.max(logx)) / 2
+            delta = logx - shift
+            M = abs(t) * (np.max(logx) - shift)
+            h0, h1, h2 = _h_scaled(t * delta, M)
+            g, dg, d2g = delta * h0, delta**2 * h1, delta**3 * h2
+        else:
+            l, m = self.log1p_pos, self.log1p_neg
+            shift, w = 0.0, None
+            M = np.maximum(np.maximum(lmb * np.max(l), (2 - lmb) * np.max(m)), 0.0)
+            h0_pos, h1_pos, h2_pos = _h_scaled(lmb * l, M)
+            h0_neg, h1_neg, h2_neg = _h_scaled((2 - lmb) * m, M)
+            zero = np.zeros((len(lmb), 1 if self.n_zero > 0 else 0))
+            if self.n_zero > 0:
+                w = np.append(np.ones(len(self.x)), self.n_zero)
+            g = np.concatenate([l * h0_pos, -m * h0_neg, zero], axis=1)
+            dg = np.concatenate([l**2 * h1_pos, m**2 * h1_neg, zero], axis=1)
+            d2g = np.concatenate([l**3 * h2_pos, -(m**3) * h2_neg, zero], axis=1)
+
+        mean_g, mean_dg, mean_d2g = (
+            np.average(a, axis=-1, weights=w) for a in (g, dg, d2g)
+        )
+        g = g - mean_g[:, None]
+        dg = dg - mean_dg[:, None]
+        wg, wdg = (g, dg) if w is None else (w * g, w * dg)
+        moments = np.stack(
+            [
+                mean_g,
+                mean_dg,
+                mean_d2g,
+                np.sum(wg * g, axis=-1),
+                np.sum(wg * dg, axis=-1),
+                np.sum(wdg * dg, axis=-1) + np.sum(wg * d2g, axis=-1),
+            ],
+            axis=-1,
+        )
+        return shift, np.broadcast_to(M, lmb.shape)[:, 0], moments
+
+    def dllf(self, lmb):
+        # (c, n, shift, logscale, moments) for boxcox and
+        # (c, n_pos, n_neg, shift, logscale, moments) for yeojohnson,
+        # the derivative statistics of _dstats merged at server side
+        lmb_arr = np.atleast_1d(lmb).astype(np.float64)
+        if lmb_arr.ndim > 1:
+            raise ValueError("lmb must be a scalar or 1D array")
+
+        shift, logscale, moments = (
+            0.0,
+            np.zeros(len(lmb_arr)),
+            np.zeros((len(lmb_arr), 6)),
+        )
+        if self.n > 0:
+            parts = [
+                self._dstats(lmb_arr[s])
+                for s in _gen_lmb_slices(len(lmb_arr), len(self.x) + 1)
+            ]
+            shift = parts[0][0]
+            logscale = np.concatenate([p[1] for p in parts])
+            moments = np.concatenate([p[2] for p in parts])
+
+        if np.isscalar(lmb):
+            logscale, moments = logscale[0], moments[0]
+
+        if self.power == "boxcox":
+            return self.c, self.n, shift, logscale, moments
+        elif self.power == "yeojohnson":
+            return self.c, self.n_pos, self.n_neg, shift, logscale, moments
+
+    def sketch(self, max_bins=_MAX_BINS):
+        # (n_zero, {part: sketch}) with a log_sketch per sign, "pos" of logx
+        # (boxcox) or log1p(x) and "neg" of log1p(-x), sent once per fit
+        if self.power == "boxcox":
+            return 0, {"pos": log_sketch(self.logx, max_bins)}
+        elif self.power == "yeojohnson":
+            return self.n_zero, {
+                "pos": log_sketch(self.log1p_pos, max_bins),
+                "neg": log_sketch(self.log1p_neg, max_bins),
+            }
+
     def _llf(self, lmb, var_comp):
+        # Statistics for a 1D chunk of lambdas in one (lambdas x n) pass
         if self.n == 0:
-            return -np.inf, -np.inf
+            return np.full(lmb.shape, -np.inf), np.full(lmb.shape, -np.inf)
 
         if self.power == "boxcox":
-            logpsi = self.log_boxcox(lmb)
+            logpsi, sign = self.log_boxcox(lmb)
         elif self.power == "yeojohnson":
-            logpsi = self.log_yeojohnson(lmb)
+            logpsi, sign = self.log_yeojohnson(lmb)
 
+        logzero = self.log_zero(lmb)
         if var_comp == "pairwise":
-            logmean, logM2 = self.pairwise_variance(logpsi)
+            logmean, logM2 = self.pairwise_variance(logpsi, sign, logzero)
             return logmean, logM2
         elif var_comp == "naive":
-            logsum, logsumsq = self.naive_variance(logpsi)
+            logsum, logsumsq = self.naive_variance(logpsi, sign, logzero)
             return logsum, logsumsq
 
-    def llf(self, lmb, var_comp="pairwise"):
-        lmb_arr = np.atleast_1d(lmb)
+    def llf(self, lmb, var_comp="pairwise", compression=None):
+        if var_comp == "newton":
+            return self.dllf(lmb)
+        elif var_comp == "sketch":  # does not depend on lmb
+            return self.sketch()
+
+        lmb_arr = np.atleast_1d(lmb).astype(np.float64)
         if lmb_arr.ndim > 1:
             raise ValueError("lmb must be a scalar or 1D array")
 
+        # Chunks of lambdas bound the size of the (lambdas x n) block
         item1, item2 = [], []
-        for l in lmb_arr:
-            i1, i2 = self._llf(l, var_comp)
+        for s in _gen_lmb_slices(len(lmb_arr), len(self.x)):
+            i1, i2 = self._llf(lmb_arr[s], var_comp)
             item1.append(i1)
             item2.append(i2)
 
-        item1 = np.asarray(item1)
-        item2 = np.asarray(item2)
+        item1 = np.concatenate(item1)
+        item2 = np.concatenate(item2)
 
         if np.isscalar(lmb):
             item1, item2 = item1[0], item2[0]
 
         if self.power == "boxcox":
-            return self.c, self.n, item1, item2
+            response = self.c, self.n, item1, item2
         elif self.power == "yeojohnson":
-            return self.c, self.n_pos, self.n_neg, item1, item2
+            response = self.c, self.n_pos, self.n_neg, item1, item2
+
+        if compression is not None:
+            response = quantize_response(response, compression)
+        return response
+
+
+class FedPowerMultiClient:
+    # Client holding a feature matrix with one FedPowerClient per column. A
+    # request has one row of lambdas per feature and rows with NaN are not
+    # requested, the responses of the requested features are stacked
+
+    def __init__(self, power, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[:, None]
+        if X.ndim != 2:
+            raise ValueError("X must be a 1D or 2D array")
+
+        self.power = power
+        self.n_features = X.shape[1]
+        self.columns = [FedPowerClient(power, X[:, j]) for j in range(self.n_features)]
+
+    def llf(self, lmb, var_comp="pairwise"):
+        lmb = np.asarray(lmb, dtype=np.float64)
+        if lmb.ndim != 2 or lmb.shape[0] != self.n_features:
+            raise ValueError("lmb must be a 2D array with one row per feature")
+
+        requested = np.flatnonzero(~np.any(np.isnan(lmb), axis=1))
+        responses = [self.columns[j].llf(lmb[j], var_comp) for j in requested]
+        return tuple(np.array(a) for a in zip(*responses))
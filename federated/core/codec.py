@@ -0,0 +1,68 @@
+import numpy as np
+
+_PRECISIONS = ["float64", "float32", "bfloat16"]
+_UNIT_ROUNDOFF = {"float64": 2.0**-53, "float32": 2.0**-24, "bfloat16": 2.0**-8}
+_BITS = {"float64": "<i8", "float32": "<i4", "bfloat16": "<i2"}
+
+
+class Compression:
+    # Codec of the log statistics sent by clients. Values are rounded to
+    # precision ("float64", "float32" or "bfloat16"), with delta=True the bit
+    # patterns of neighbouring lambdas are sent as differences (lossless, it
+    # leaves mostly zero high bytes) and level > 0 compresses with zlib
+
+    def __init__(self, precision="float32", delta=True, level=6):
+        if precision not in _PRECISIONS:
+            raise ValueError(f"precision must be one of {_PRECISIONS}")
+        if not 0 <= level <= 9:
+            raise ValueError("level must be an integer in [0, 9]")
+
+        self.precision = precision
+        self.delta = bool(delta)
+        self.level = int(level)
+        self.unit_roundoff = _UNIT_ROUNDOFF[precision]
+        self.dtype = np.dtype(_BITS[precision])
+
+    def _bits(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if self.precision == "float64":
+            return values.astype("<f8").view(self.dtype)
+        elif self.precision == "float32":
+            return values.astype("<f4").view(self.dtype)
+
+        # bfloat16 is the upper half of float32, rounded to nearest even
+        bits = values.astype("<f4").view("<u4")
+        bits = (bits + 0x7FFF + ((bits >> 16) & 1)) >> 16
+        return bits.astype("<u2").view(self.dtype)
+
+    def _values(self, bits):
+        if self.precision == "float64":
+            return bits.view("<f8").astype(np.float64)
+        elif self.precision == "float32":
+            return bits.view("<f4").astype(np.float64)
+        return (bits.view("<u2").astype("<u4") << 16).view("<f4").astype(np.float64)
+
+    def quantize(self, values):
+        # values as the receiver decodes them
+        return self._values(self._bits(values))[()]
+
+    def pack(self, values):
+        bits = self._bits(np.ravel(values))
+        if self.delta:
+            bits = np.diff(bits, prepend=bits.dtype.type(0))  # wraps around
+        return bits.tobytes()
+
+    def unpack(self, buffer, count, offset=0):
+        bits = np.frombuffer(buffer, self.dtype, count, offset)
+        if self.delta:
+            bits = np.cumsum(bits, dtype=self.dtype)
+        return self._values(bits)
+
+
+def quantize_response(response, compression):
+    # Client response as the server decodes it, signs are sent exactly
+    *counts, item1, item2 = response
+    log1 = compression.quantize(np.real(item1))
+    if np.iscomplexobj(item1):
+        log1 = log1 + 1j * np.imag(item1)
+    return (*counts, log1, compression.quantize(item2))
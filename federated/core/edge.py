@@ -0,0 +1,31 @@
+import numpy as np
+from .server import FedPowerServer
+
+
+class EdgeAggregator:
+    # Intermediate node of a hierarchical topology with the llf interface of
+    # FedPowerClient: it merges the responses of its clients (or of lower
+    # edges) per bucket and forwards one summary upward. An edge waits for all
+    # its clients, the deadline of the server above applies to the edge
+
+    def __init__(self, power, clients, backend="serial"):
+        self.power = power
+        self.server = FedPowerServer(power, clients, backend)
+
+    @property
+    def clients(self):
+        return self.server.clients
+
+    @property
+    def trace(self):
+        return self.server.trace
+
+    def llf(self, lmb, var_comp="pairwise", compression=None):
+        lmb_arr = np.atleast_1d(lmb).astype(np.float64)
+        if lmb_arr.ndim > 1:
+            raise ValueError("lmb must be a scalar or 1D array")
+        if var_comp not in ("pairwise", "naive"):
+            raise ValueError("edges only forward 'pairwise' or 'naive' statistics")
+        if compression is not None:
+            raise ValueError("edges only forward uncompressed statistics")
+        return self.server.summarize(lmb_arr, var_comp)
@@ -0,0 +1,43 @@
+import numpy as np
+from sklearn.utils import check_random_state
+
+
+class NetworkModel:
+    # Per-client links with a one-way latency (s), a bandwidth (bytes/s) and an
+    # exponential jitter of mean jitter (s) on every message. The clients of a
+    # round work in parallel, so a round lasts as long as its slowest client
+    # plus the aggregation at the server
+
+    def __init__(self, latency=0.05, bandwidth=1e7, jitter=0.0, rng=None):
+        if latency < 0 or jitter < 0:
+            raise ValueError("latency and jitter must be non-negative")
+        if bandwidth <= 0:
+            raise ValueError("bandwidth must be strictly positive")
+
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.jitter = jitter
+        self.rng = check_random_state(rng)
+
+    def _delay(self, n_bytes):
+        delay = self.latency + np.asarray(n_bytes) / self.bandwidth
+        if self.jitter > 0:
+            delay = delay + self.rng.exponential(self.jitter, np.shape(n_bytes))
+        return delay
+
+    def round_time(self, record):
+        # Predicted wall-clock time of one round of a server trace, the server
+        # waits until the deadline when a client was late (NaN compute time)
+        client_time = (
+            self._delay(record["bytes_out"])
+            + record["compute_time"]
+            + self._delay(record["bytes_in"])
+        )
+        wait = np.max(client_time, initial=0.0, where=~np.isnan(client_time))
+        if np.any(np.isnan(client_time)) and record.get("deadline") is not None:
+            wait = max(wait, record["deadline"])
+        return wait + record["aggregate_time"]
+
+    def predict(self, trace):
+        # Predicted wall-clock time of a whole trace
+        return sum(self.round_time(record) for record in trace)
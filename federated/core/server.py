@@ -1,290 +1,422 @@
+import time
 import numpy as np
 from scipy.special import logsumexp
 from scipy.optimize import brent
+from numerical.optimize.utils import _log_add, _log_merge
+from numerical.optimize.batch import batch_brent
+from numerical.optimize.newton import newton_max
+from numerical.optimize.prepared import _h_scaled
+from .backend import get_backend
 from .grid import gridsearch
+from .speculative import speculative_brent
+from .codec import quantize_response
+from .sketch import merge_sketches, sketch_data, sketch_error
+from .transport import (
+    request_size,
+    response_size,
+    compressed_size,
+    dstats_size,
+    sketch_size,
+)
+
+
+def _decode(logx):
+    # log|x| and sign(x) from a log sent by clients, negative values
+    # carry a complex phase of pi
+    if not np.iscomplexobj(logx):
+        return logx, np.ones_like(logx)
+    return np.real(logx), np.where(np.cos(np.imag(logx)) < 0, -1.0, 1.0)
+
+
+def _tree_merge(n, logmean, smean, logM2):
+    # Pairwise merge of the k sets along the first axis in log2(k) levels,
+    # n has shape (k, 1) and the other arrays (k, lambdas)
+    while n.shape[0] > 1:
+        m = n.shape[0] // 2 * 2  # an odd set waits for the next level
+        merged = _log_merge(
+            n[0:m:2],
+            logmean[0:m:2],
+            smean[0:m:2],
+            logM2[0:m:2],
+            n[1:m:2],
+            logmean[1:m:2],
+            smean[1:m:2],
+            logM2[1:m:2],
+        )
+        n, logmean, smean, logM2 = (
+            np.concatenate([a, b[m:]])
+            for a, b in zip(merged, (n, logmean, smean, logM2))
+        )
+    return n[0, 0], logmean[0], smean[0], logM2[0]
+
+
+def _naive_var(logsum, logsumsq, n):
+    # Compute naive variance from the stacked logsum and logsumsq of sets
+    logmean = logsumexp(logsum, axis=0) - np.log(n)
+    logmean_sq = logsumexp(logsumsq, axis=0) - np.log(n)
+    # var = mean_sq - mean^2
+    return np.real(logsumexp([logmean_sq, 2 * logmean + np.pi * 1j], axis=0))
+
+
+def _response_bytes(power, response, var_comp, compression=None):
+    # Bytes on the wire of a response, one message per bucket of an edge
+    if response is None:
+        return 0
+    if var_comp == "newton":
+        return dstats_size(np.size(response[-2]))
+    if var_comp == "sketch":
+        return sketch_size([len(sketch[1]) for sketch in response[1].values()])
+    if compression is not None and np.ndim(response[0]) == 0:
+        return compressed_size(power, response, compression)
+    if isinstance(response[-1], dict):
+        return sum(
+            response_size(np.size(item1), np.iscomplexobj(item1))
+            for _, item1, _ in response[-1].values()
+        )
+    # one message per feature of a stacked response
+    item1 = np.atleast_2d(response[-2])
+    return len(item1) * response_size(item1.shape[1], np.iscomplexobj(item1))
+
+
+def _newton_merge(power, lmb, responses):
+    # llf and its first two derivatives at lmb from the derivative statistics
+    # of the clients. Clients are moved to a common frame: a shift of logx
+    # when all data have one sign (else none), and a common scale e^S. With
+    # g = a * g_i + b, a = e^(t * d) and b = d * h0(t * d) for a shift by d,
+    # means and centered sums follow in closed form and merge as co-moments
+    c = 0
+    rows = []
+    for response in responses:
+        if power == "boxcox":
+            c_i, n_i, shift, logscale, moments = response
+            kind = "pos"
+        elif power == "yeojohnson":
+            c_i, n_pos_i, n_neg_i, shift, logscale, moments = response
+            n_i = n_pos_i + n_neg_i
+            kind = "pos" if n_neg_i == 0 else ("neg" if n_pos_i == 0 else "mix")
+
+        if n_i == 0:
+            continue
+        c += c_i
+        rows.append((kind, n_i, shift, logscale, moments))
+
+    kind, n, shift, logscale, moments = zip(*rows)
+    neg = np.array([k == "neg" for k in kind])[:, None]
+    n = np.array(n, dtype=np.float64)[:, None]
+    shift = np.array(shift, dtype=np.float64)[:, None]
+    logscale = np.array(logscale).reshape(len(rows), -1)
+    moments = np.array(moments).reshape(len(rows), -1, 6)
+    n_all = np.sum(n)
+
+    # Shifted frame in t = lmb (all positive), t = 2 - lmb (all negative),
+    # otherwise an unshifted frame in lmb where negative data flip sign
+    shifted = len(set(kind)) == 1 and kind[0] != "mix"
+    shift_all = np.sum(n * shift) / n_all if shifted else 0.0
+    t = np.where(neg, 2 - lmb, lmb)
+    d = shift - shift_all
+    tau = t * d
+    S = np.max(logscale + tau, axis=0)
+    f = np.exp(logscale + tau - S)
+    b0, b1, b2 = _h_scaled(tau, S)
+
+    mean_g, mean_dg, mean_d2g, S_gg, S_gdg, S_2 = np.moveaxis(moments, -1, 0)
+    mean_g, mean_dg, mean_d2g = (
+        f * mean_g + d * b0,
+        f * (mean_dg + d * mean_g) + d**2 * b1,
+        f * (mean_d2g + 2 * d * mean_dg + d**2 * mean_g) + d**3 * b2,
+    )
+    S_gg, S_gdg, S_2 = (
+        f**2 * S_gg,
+        f**2 * (S_gdg + d * S_gg),
+        f**2 * (S_2 + 4 * d * S_gdg + 2 * d**2 * S_gg),
+    )
+    if not shifted:
+        # psi = -g in 2 - lmb, so g and g'' flip sign in lmb
+        sign = np.where(neg, -1.0, 1.0)
+        mean_g, mean_d2g, S_gdg = sign * mean_g, sign * mean_d2g, sign * S_gdg
+
+    dev_g, dev_dg, dev_d2g = (
+        a - np.sum(n * a, axis=0) / n_all for a in (mean_g, mean_dg, mean_d2g)
+    )
+    S_gg = np.sum(S_gg + n * dev_g**2, axis=0)
+    S_gdg = np.sum(S_gdg + n * dev_g * dev_dg, axis=0)
+    S_2 = np.sum(S_2 + n * (dev_dg**2 + dev_g * dev_d2g), axis=0)
+
+    r = S_gdg / S_gg
+    d2 = -n_all * S_2 / S_gg + 2 * n_all * r**2
+    if shifted and kind[0] == "neg":
+        t_all = 2 - lmb
+        d1 = c + n_all * shift_all + n_all * r
+    else:
+        t_all = lmb
+        d1 = c - n_all * shift_all - n_all * r
+
+    logvar = np.log(S_gg / n_all) + 2 * S + 2 * t_all * shift_all
+    return (lmb - 1) * c - n_all / 2 * logvar, d1, d2
+
+
+def _unstack(response, i):
+    # Response of the i-th feature of a stacked response, item1 is complex
+    # only when it carries signs as sent by FedPowerClient
+    *counts, item1, item2 = (a[i] for a in response)
+    if np.iscomplexobj(item1) and not np.any(np.imag(item1)):
+        item1 = np.real(item1)
+    return (*counts, item1, item2)
+
+
+class _Restart(Exception):
+    # Participants of an optimization missed a round, it starts over
+    # with the remaining ones
+    pass
 
 
 class FedPowerServer:
-
-    def __init__(self, power, clients):
+    # A round waits at most deadline seconds for the clients, at least a
+    # fraction quorum in (0, 1] of all clients (rounded up) must answer in
+    # time, an integer quorum is a fraction too: quorum=1 means all clients.
+    # mle fixes the participating set in its first round so every lambda is
+    # evaluated on the same data, self.participants are their indices.
+    # Clients send compressed statistics when compression is given, mle then
+    # bounds the induced error of lambda in self.lmb_error
+
+    def __init__(
+        self,
+        power,
+        clients,
+        backend="serial",
+        deadline=None,
+        quorum=1.0,
+        compression=None,
+    ):
         self.power = power
         self.clients = clients
-
-    def naive_variance(self, lmb):
-        def _naive_var(logsum, logsumsq, n):
-            # Compute naive variance from logsum and logsumsq
-            logmean = logsumexp(logsum, axis=0) - np.log(n)
-            logmean_sq = logsumexp(logsumsq, axis=0) - np.log(n)
-            # var = mean_sq - mean^2
-            logvar = np.real(logsumexp([logmean_sq, 2 * logmean + np.pi * 1j], axis=0))
-            return logvar
-
-        if self.power == "boxcox":
-            c, n = 0, 0
-            logsum, logsumsq = [], []
-
-            for client in self.clients:
-                c_i, n_i, logsum_i, logsumsq_i = client.llf(lmb, var_comp="naive")
-
-                if n_i == 0:
-                    continue
-
-                c += c_i
-                n += n_i
-
-                logsum.append(logsum_i)
-                logsumsq.append(logsumsq_i)
-
-            logvar = _naive_var(logsum, logsumsq, n)
-
-            neq_0 = abs(lmb) >= np.spacing(1.0)
-            logvar[neq_0] -= 2 * np.log(abs(lmb[neq_0]))
-
-        elif self.power == "yeojohnson":
-            c, n_pos, n_neg, n_mix = 0, 0, 0, 0
-            logsum_pos, logsumsq_pos = [], []
-            logsum_neg, logsumsq_neg = [], []
-            logsum_mix, logsumsq_mix = [], []
-
-            for client in self.clients:
-                (
-                    c_i,
-                    n_pos_i,
-                    n_neg_i,
-                    logsum_i,
-                    logsumsq_i,
-                ) = client.llf(lmb, var_comp="naive")
-
-                if n_pos_i + n_neg_i == 0:
-                    continue
-
-                c += c_i
-
+        self.backend = get_backend(backend)
+        self.compression = compression
+        self.lmb_error = None
+        self.trace = []  # one record per round
+
+        if deadline is not None and deadline <= 0:
+            raise ValueError("deadline must be strictly positive or None")
+        if not 0 < quorum <= 1:
+            raise ValueError("quorum must be a fraction of the clients in (0, 1]")
+        self.min_clients = max(int(np.ceil(quorum * len(clients))), 1)
+        self.deadline = deadline
+        self.quorum = quorum
+
+        self.participants = None
+        self._fixed = False  # within mle
+
+    def _collect(self, lmb, var_comp, compression=None):
+        # Responses of the clients that answered in time in client order,
+        # the round is recorded with the message sizes of the binary transport
+        start = time.perf_counter()
+        if self._fixed and self.participants is not None:
+            index = self.participants
+        else:
+            index = np.arange(len(self.clients))
+        responses, compute_time = self.backend.map(
+            [self.clients[i] for i in index], lmb, var_comp, self.deadline, compression
+        )
+        on_time = np.array([response is not None for response in responses], bool)
+
+        self._round = record = {
+            "lmb": np.array(lmb),
+            "var_comp": var_comp,
+            "compression": compression,
+            "clients": index,
+            "contributors": index[on_time],
+            "deadline": self.deadline,
+            "bytes_out": np.full(len(responses), request_size(np.size(lmb))),
+            "bytes_in": np.array(
+                [
+                    _response_bytes(self.power, response, var_comp, compression)
+                    for response in responses
+                ],
+                dtype=np.int64,
+            ),
+            "compute_time": np.array(compute_time, dtype=np.float64),
+            "collect_time": time.perf_counter() - start,
+        }
+
+        n_on_time = np.count_nonzero(on_time)
+        if n_on_time < self.min_clients or (
+            self._fixed and self.participants is not None and n_on_time < len(index)
+        ):
+            record["aggregate_time"] = 0.0
+            self.trace.append(record)
+            if n_on_time < self.min_clients:
+                raise RuntimeError(
+                    f"{n_on_time} of {len(self.clients)} clients answered "
+                    f"in time, the quorum is {self.min_clients}"
+                )
+            self.participants = index[on_time]
+            raise _Restart
+
+        if self._fixed and self.participants is None:
+            self.participants = index[on_time]
+        return [response for response in responses if response is not None]
+
+    def _bucketize(self, lmb, responses):
+        # Sum c and stack the responses of clients with data into buckets
+        # {key: (n, item1, item2, lmb_u)} with one row per client. Clients in
+        # a bucket with lmb_u send u = exp(lmb_u * logx) where
+        # psi = (u - 1) / lmb_u (psi itself where lmb_u = 0), the others send
+        # psi. Edge aggregators send one row per bucket
+        c = 0
+        groups = {}
+        for response in responses:
+            if isinstance(response[-1], dict):  # (c, {key: (n, item1, item2)})
+                c += response[0]
+                for key, row in response[-1].items():
+                    groups.setdefault(key, []).append(row)
+                continue
+
+            if self.power == "boxcox":
+                c_i, n_i, item1, item2 = response
+                key = "u"
+            elif self.power == "yeojohnson":
+                c_i, n_pos_i, n_neg_i, item1, item2 = response
+                n_i = n_pos_i + n_neg_i
                 if n_neg_i == 0:
-                    n_pos += n_pos_i
-                    logsum_pos.append(logsum_i)
-                    logsumsq_pos.append(logsumsq_i)
+                    key = "pos"
                 elif n_pos_i == 0:
-                    n_neg += n_neg_i
-                    logsum_neg.append(logsum_i)
-                    logsumsq_neg.append(logsumsq_i)
+                    key = "neg"
                 else:
-                    n_mix += n_pos_i + n_neg_i
-                    logsum_mix.append(logsum_i)
-                    logsumsq_mix.append(logsumsq_i)
-
-            if n_neg == 0 and n_mix == 0:  # all positive
-                logvar = _naive_var(logsum_pos, logsumsq_pos, n_pos)
-
-                neq_0 = abs(lmb) >= np.spacing(1.0)
-                logvar[neq_0] -= 2 * np.log(abs(lmb[neq_0]))
-
-            elif n_pos == 0 and n_mix == 0:  # all negative
-                logvar = _naive_var(logsum_neg, logsumsq_neg, n_neg)
-
-                neq_2 = abs(lmb - 2) >= np.spacing(1.0)
-                logvar[neq_2] -= 2 * np.log(abs(2 - lmb[neq_2]))
-
-            else:  # mixed positive and negative
-                if n_pos > 0:
-                    logsum_pos = logsumexp(logsum_pos, axis=0).astype(np.complex128)
-                    logsumsq_pos = logsumexp(logsumsq_pos, axis=0).astype(np.complex128)
-
-                    neq_0 = abs(lmb) >= np.spacing(1.0)
-
-                    # (((x+1)^lmb - 1) / lmb)^2
-                    # = ((x+1)^(2*lmb) - 2*(x+1)^lmb + 1) / lmb^2
-                    logsumsq_pos[neq_0] = logsumexp(
-                        [
-                            logsumsq_pos[neq_0],
-                            logsum_pos[neq_0] + np.log(2) + np.pi * 1j,
-                            np.full_like(logsum_pos[neq_0], np.log(n_pos)),
-                        ],
-                        axis=0,
-                    ) - 2 * np.log(abs(lmb[neq_0]))
-                    logsum_pos[neq_0] = logsumexp(
-                        [
-                            logsum_pos[neq_0],
-                            np.log(n_pos)
-                            + np.full_like(
-                                logsum_pos[neq_0], np.pi * 1j, dtype=np.complex128
-                            ),
-                        ],
-                        axis=0,
-                    ) - np.log(lmb[neq_0] + 0j)
-
-                if n_neg > 0:
-                    logsum_neg = logsumexp(logsum_neg, axis=0).astype(np.complex128)
-                    logsumsq_neg = logsumexp(logsumsq_neg, axis=0).astype(np.complex128)
-
-                    neq_2 = abs(lmb - 2) >= np.spacing(1.0)
-
-                    # (((-x+1)^(2-lmb) - 1) / (lmb-2))^2
-                    # = ((-x+1)^(2*(2-lmb)) - 2*(-x+1)^(2-lmb) + 1) / (lmb-2)^2
-                    logsumsq_neg[neq_2] = logsumexp(
-                        [
-                            logsumsq_neg[neq_2],
-                            logsum_neg[neq_2] + np.log(2) + np.pi * 1j,
-                            np.full_like(logsum_neg[neq_2], np.log(n_neg)),
-                        ],
-                        axis=0,
-                    ) - 2 * np.log(abs(lmb[neq_2] - 2))
-                    logsum_neg[neq_2] = logsumexp(
-                        [
-                            logsum_neg[neq_2],
-                            np.log(n_neg)
-                            + np.full_like(
-                                logsum_neg[neq_2], np.pi * 1j, dtype=np.complex128
-                            ),
-                        ],
-                        axis=0,
-                    ) - np.log(lmb[neq_2] - 2 + 0j)
-
-                if n_mix > 0:
-                    logsum_mix = logsumexp(logsum_mix, axis=0)
-                    logsumsq_mix = logsumexp(logsumsq_mix, axis=0)
-
-                logsum, logsumsq = [], []
-                if n_pos > 0:
-                    logsum.append(logsum_pos)
-                    logsumsq.append(logsumsq_pos)
-                if n_neg > 0:
-                    logsum.append(logsum_neg)
-                    logsumsq.append(logsumsq_neg)
-                if n_mix > 0:
-                    logsum.append(logsum_mix)
-                    logsumsq.append(logsumsq_mix)
-
-                logvar = _naive_var(logsum, logsumsq, n_pos + n_neg + n_mix)
-
-            n = n_pos + n_neg + n_mix
-
-        return c, n, logvar
-
-    def pairwise_variance(self, lmb):
-        def _pairwise_var(triplet):
-            while len(triplet) >= 2:
-                n_1, logmean_1, logM2_1 = triplet.pop(0)
-                n_2, logmean_2, logM2_2 = triplet.pop(0)
-
-                n = n_1 + n_2
-                logdelta = logsumexp([logmean_2, logmean_1 + np.pi * 1j], axis=0)
-                logmean = logsumexp([logmean_1, logdelta + np.log(n_2 / n)], axis=0)
-                logM2 = logsumexp(
-                    [logM2_1, logM2_2, 2 * logdelta + np.log(n_1 * n_2 / n)], axis=0
+                    key = "mix"
+
+            if n_i == 0:
+                continue
+
+            c += c_i
+            groups.setdefault(key, []).append((n_i, item1, item2))
+
+        lmb_u = {"u": lmb, "pos": lmb, "neg": lmb - 2, "mix": None}
+        buckets = {}
+        for key, group in groups.items():
+            n, item1, item2 = zip(*group)
+            buckets[key] = (
+                np.asarray(n, dtype=np.float64)[:, None],
+                np.asarray(item1).reshape(len(group), -1),
+                np.asarray(item2).reshape(len(group), -1),
+                lmb_u[key],
+            )
+        return c, buckets
+
+    def summarize(self, lmb, var_comp="pairwise"):
+        # Responses merged per bucket into (c, {key: (n, item1, item2)}), the
+        # rows are in the format of the clients so summaries merge further up
+        start = time.perf_counter()
+        c, buckets = self._bucketize(
+            lmb, self._collect(lmb, var_comp, self.compression)
+        )
+
+        summary = {}
+        for key, (n, item1, item2, _) in buckets.items():
+            if var_comp == "pairwise":
+                logmean, smean = _decode(item1)
+                n, logmean, smean, logM2 = _tree_merge(n, logmean, smean, item2)
+                if np.any(smean < 0):
+                    logmean = logmean + np.pi * 1j * (smean < 0)
+                summary[key] = (n, logmean, logM2)
+            elif var_comp == "naive":
+                summary[key] = (
+                    np.sum(n),
+                    logsumexp(item1, axis=0),
+                    logsumexp(item2, axis=0),
                 )
 
-                triplet.append((n, logmean, logM2))
-
-            n, logmean, logM2 = triplet[0]
-            return n, logmean, np.real(logM2)
-
-        if self.power == "boxcox":
-            c = 0
-            triplet = []
-
-            for client in self.clients:
-                c_i, n_i, logmean_i, logM2_i = client.llf(lmb, var_comp="pairwise")
-
-                if n_i == 0:
-                    continue
-
-                c += c_i
-
-                triplet.append((n_i, logmean_i, logM2_i))
-
-            n, _, logM2 = _pairwise_var(triplet)
+        self._record(start)
+        return c, summary
 
-            neq_0 = abs(lmb) >= np.spacing(1.0)
-            logM2[neq_0] -= 2 * np.log(abs(lmb[neq_0]))
+    def naive_variance(self, lmb):
+        return self._naive_variance(lmb, self._collect(lmb, "naive", self.compression))
+
+    def _naive_variance(self, lmb, responses):
+        c, buckets = self._bucketize(lmb, responses)
+
+        n, logsum, logsumsq = [], [], []
+        for n_b, logsum_b, logsumsq_b, lmb_u in buckets.values():
+            n_b = np.sum(n_b)
+            logsum_b = logsumexp(logsum_b, axis=0)
+            logsumsq_b = logsumexp(logsumsq_b, axis=0)
+
+            if lmb_u is not None and len(buckets) > 1:
+                logsum_b = logsum_b.astype(np.complex128)
+                logsumsq_b = logsumsq_b.astype(np.complex128)
+                neq = abs(lmb_u) >= np.spacing(1.0)
+                log_n = np.full_like(logsum_b[neq], np.log(n_b))
+
+                # ((u - 1) / lmb_u)^2 = (u^2 - 2 * u + 1) / lmb_u^2
+                logsumsq_b[neq] = logsumexp(
+                    [logsumsq_b[neq], logsum_b[neq] + np.log(2) + np.pi * 1j, log_n],
+                    axis=0,
+                ) - 2 * np.log(abs(lmb_u[neq]))
+                logsum_b[neq] = logsumexp(
+                    [logsum_b[neq], log_n + np.pi * 1j], axis=0
+                ) - np.log(lmb_u[neq] + 0j)
 
-            logvar = logM2 - np.log(n)
+            n.append(n_b)
+            logsum.append(logsum_b)
+            logsumsq.append(logsumsq_b)
 
-        elif self.power == "yeojohnson":
-            c = 0
-            triplet_pos, triplet_neg, triplet_mix = [], [], []
+        n = np.sum(n)
+        logvar = _naive_var(logsum, logsumsq, n)
 
-            for client in self.clients:
-                (
-                    c_i,
-                    n_pos_i,
-                    n_neg_i,
-                    logmean_i,
-                    logM2_i,
-                ) = client.llf(lmb, var_comp="pairwise")
+        lmb_u = next(iter(buckets.values()))[3]
+        if lmb_u is not None and len(buckets) == 1:
+            # var(psi) = var(u) / lmb_u^2
+            neq = abs(lmb_u) >= np.spacing(1.0)
+            logvar[neq] -= 2 * np.log(abs(lmb_u[neq]))
 
-                if n_pos_i + n_neg_i == 0:
-                    continue
+        return c, n, logvar
 
-                c += c_i
+    def pairwise_variance(self, lmb):
+        return self._pairwise_variance(
+            lmb, self._collect(lmb, "pairwise", self.compression)
+        )
+
+    def _pairwise_variance(self, lmb, responses):
+        c, buckets = self._bucketize(lmb, responses)
+
+        merged = []
+        for n_b, logmean_b, logM2_b, lmb_u in buckets.values():
+            logmean_b, smean_b = _decode(logmean_b)
+            n_b, logmean_b, smean_b, logM2_b = _tree_merge(
+                n_b, logmean_b, smean_b, logM2_b
+            )
 
-                if n_neg_i == 0:
-                    triplet_pos.append((n_pos_i, logmean_i, logM2_i))
-                elif n_pos_i == 0:
-                    triplet_neg.append((n_neg_i, logmean_i, logM2_i))
-                else:
-                    triplet_mix.append((n_pos_i + n_neg_i, logmean_i, logM2_i))
-
-            n_pos = 0
-            if len(triplet_pos) > 0:
-                n_pos, logmean_pos, logM2_pos = _pairwise_var(triplet_pos)
-
-                neq_0 = abs(lmb) >= np.spacing(1.0)
-                logM2_pos[neq_0] -= 2 * np.log(abs(lmb[neq_0]))
-
-            n_neg = 0
-            if len(triplet_neg) > 0:
-                n_neg, logmean_neg, logM2_neg = _pairwise_var(triplet_neg)
-
-                neq_2 = abs(lmb - 2) >= np.spacing(1.0)
-                logM2_neg[neq_2] -= 2 * np.log(abs(2 - lmb[neq_2]))
-
-            n_mix = 0
-            if len(triplet_mix) > 0:
-                n_mix, logmean_mix, logM2_mix = _pairwise_var(triplet_mix)
-
-            if n_pos > 0 and (n_neg > 0 or n_mix > 0):
-                logmean_pos = logmean_pos.astype(np.complex128)
-                logmean_pos[neq_0] = logsumexp(
-                    [
-                        logmean_pos[neq_0],
-                        np.full_like(
-                            logmean_pos[neq_0], np.pi * 1j, dtype=np.complex128
-                        ),
-                    ],
-                    axis=0,
-                ) - np.log(lmb[neq_0] + 0j)
-
-            if n_neg > 0 and (n_pos > 0 or n_mix > 0):
-                logmean_neg = logmean_neg.astype(np.complex128)
-                logmean_neg[neq_2] = logsumexp(
-                    [
-                        logmean_neg[neq_2],
-                        np.full_like(
-                            logmean_neg[neq_2], np.pi * 1j, dtype=np.complex128
-                        ),
-                    ],
-                    axis=0,
-                ) - np.log(lmb[neq_2] - 2 + 0j)
+            if lmb_u is not None:
+                # mean(psi) = (mean(u) - 1) / lmb_u, M2(psi) = M2(u) / lmb_u^2
+                neq = abs(lmb_u) >= np.spacing(1.0)
+                log_lmb = np.log(abs(lmb_u[neq]))
+                logmean_neq, smean_neq = _log_add(logmean_b[neq], 0.0, smean_b[neq], -1)
+                logmean_b[neq] = logmean_neq - log_lmb
+                smean_b[neq] = smean_neq * np.sign(lmb_u[neq])
+                logM2_b[neq] -= 2 * log_lmb
 
-            triplet = []
-            if n_pos > 0:
-                triplet.append((n_pos, logmean_pos, logM2_pos))
-            if n_neg > 0:
-                triplet.append((n_neg, logmean_neg, logM2_neg))
-            if n_mix > 0:
-                triplet.append((n_mix, logmean_mix, logM2_mix))
+            merged.append((n_b, logmean_b, smean_b, logM2_b))
 
-            n, _, logM2 = _pairwise_var(triplet)
-            logvar = logM2 - np.log(n)
+        n, logmean, smean, logM2 = (np.array(a) for a in zip(*merged))
+        n, _, _, logM2 = _tree_merge(n[:, None], logmean, smean, logM2)
 
+        logvar = logM2 - np.log(n)
         return c, n, logvar
 
     def aggregate(self, lmb, var_comp="pairwise"):
+        start = time.perf_counter()
         if var_comp == "pairwise":
-            return self.pairwise_variance(lmb)
+            result = self.pairwise_variance(lmb)
         elif var_comp == "naive":
-            return self.naive_variance(lmb)
+            result = self.naive_variance(lmb)
+
+        self._record(start)
+        return result
+
+    def _record(self, start):
+        # Add the round started at start to the trace
+        record = self._round
+        record["aggregate_time"] = time.perf_counter() - start - record["collect_time"]
+        self.trace.append(record)
 
     def llf(self, lmb, var_comp="pairwise"):
         lmb_arr = np.atleast_1d(lmb)
@@ -299,6 +431,27 @@ class FedPowerServer:
 
         return ll
 
+    def _newton_llf(self, lmb):
+        # llf and its first two derivatives from one round of derivative
+        # statistics, sent uncompressed
+        lmb_arr = np.atleast_1d(lmb).astype(np.float64)
+        if lmb_arr.ndim > 1:
+            raise ValueError("lmb must be a scalar or 1D array")
+
+        start = time.perf_counter()
+        responses = self._collect(lmb_arr, "newton")
+        result = _newton_merge(self.power, lmb_arr, responses)
+        self._record(start)
+
+        if np.isscalar(lmb):
+            result = tuple(a[0] for a in result)
+        return result
+
+    def dllf(self, lmb):
+        # First and second derivatives of llf at lmb
+        _, d1, d2 = self._newton_llf(lmb)
+        return d1, d2
+
     def mle(
         self,
         brack=(-2, 2),
@@ -307,12 +460,202 @@ class FedPowerServer:
         n_points=20,
         full_output=0,
     ):
+        # optimize="newton" runs safeguarded Newton iterations on derivative
+        # statistics (var_comp is unused), usually in fewer rounds than brent
+        if optimize == "newton" and self.compression is not None:
+            raise ValueError("optimize='newton' does not support compression")
+
         def _neg_llf(lmb):
             return -self.llf(lmb, var_comp)
 
-        if optimize == "brent":
-            return brent(_neg_llf, brack=brack, full_output=full_output)
-        elif optimize == "grid":
-            return gridsearch(
-                _neg_llf, brack=brack, n_points=n_points, full_output=full_output
+        def _newton():
+            n_rounds = len(self.trace)
+            last = {}
+
+            def _dllf(lmb):
+                last["llf"], d1, d2 = self._newton_llf(lmb)
+                return d1, d2
+
+            def _llf(lmb):
+                return self._newton_llf(lmb)[0]
+
+            lmb = newton_max(_dllf, brack=brack, func=_llf)
+            if not full_output:
+                return lmb
+            return lmb, -last["llf"], len(self.trace) - n_rounds
+
+        def _fit():
+            if optimize == "brent":
+                result = brent(_neg_llf, brack=brack, full_output=full_output)
+            elif optimize == "grid":
+                result = gridsearch(
+                    _neg_llf, brack=brack, n_points=n_points, full_output=full_output
+                )
+            elif optimize == "speculative":
+                result = speculative_brent(
+                    _neg_llf, brack=brack, full_output=full_output
+                )
+            elif optimize == "newton":
+                return _newton()
+            else:
+                raise ValueError(
+                    "optimize must be one of "
+                    "'brent', 'grid', 'speculative' or 'newton'"
+                )
+
+            if self.compression is not None:
+                lmb = result[0] if full_output else result
+                self.lmb_error = self.compression_error(lmb, var_comp)
+            return result
+
+        return self._session(_fit)
+
+    def sketch_mle(self, brack=(-2, 2), refine=False, full_output=0):
+        # One-round fit: each client sends a histogram sketch of its logs once
+        # and the server maximizes the llf of the merged sketch, the exact
+        # maximizer is within self.lmb_error of it. With refine, one round of
+        # derivative statistics takes a Newton step from there, limited to
+        # that distance
+        def _fit():
+            n_rounds = len(self.trace)
+            start = time.perf_counter()
+            n_zero, parts = merge_sketches(self._collect(np.empty(0), "sketch"))
+            data = sketch_data(self.power, n_zero, parts)
+            lmb = newton_max(data.dllf, brack=brack, func=data.llf)
+            ll = data.llf(lmb)
+
+            # Error bound on lambda as in compression_error, the llf error is
+            # taken at lmb and at the resulting distance on both sides
+            def _error(lmb):
+                logvar = 2 * ((lmb - 1) * data.c - data.llf(lmb)) / data.n
+                return sketch_error(parts, lmb, logvar, data.n)
+
+            curvature = data.dllf(lmb)[1]
+            self.lmb_error = np.inf
+            if curvature < 0:
+                bound = np.sqrt(4 * _error(lmb) / -curvature)
+                if np.isfinite(bound):
+                    error = max(_error(lmb), _error(lmb - bound), _error(lmb + bound))
+                    self.lmb_error = np.sqrt(4 * error / -curvature)
+            self._record(start)
+
+            if refine:
+                # The exact llf is modelled to second order along the step
+                ll, d1, d2 = self._newton_llf(lmb)
+                step = -d1 / d2 if d2 < 0 else 0.0
+                step = np.clip(step, -self.lmb_error, self.lmb_error)
+                ll = ll + d1 * step + d2 * step**2 / 2
+                lmb = lmb + step
+
+            if not full_output:
+                return lmb
+            return lmb, -ll, len(self.trace) - n_rounds
+
+        return self._session(_fit)
+
+    def compression_error(self, lmb, var_comp="pairwise"):
+        # Bound of the shift of the maximizer lmb induced by compression. One
+        # round at full precision around lmb gives the exact llf, its
+        # curvature and the error e of the compressed llf, the maximizer
+        # moves by about sqrt(4 * max|e| / |llf''|) at most
+        h = 1e-3 * max(1.0, abs(lmb))
+        lmb_arr = np.array([lmb - h, lmb, lmb + h])
+        start = time.perf_counter()
+        responses = self._collect(lmb_arr, var_comp)
+
+        variance = (
+            self._pairwise_variance if var_comp == "pairwise" else self._naive_variance
+        )
+        c, n, logvar = variance(lmb_arr, responses)
+        exact = (lmb_arr - 1) * c - n / 2 * logvar
+        c, n, logvar = variance(
+            lmb_arr,
+            [quantize_response(r, self.compression) for r in responses],
+        )
+        error = np.max(abs((lmb_arr - 1) * c - n / 2 * logvar - exact))
+        curvature = (exact[0] - 2 * exact[1] + exact[2]) / h**2
+        self._record(start)
+
+        if not curvature < 0:
+            return np.inf
+        return np.sqrt(4 * error / -curvature)
+
+    def _session(self, optimize):
+        # Run optimize on the participating set fixed in its first round,
+        # from scratch again whenever participants are lost
+        self.participants = None
+        self._fixed = True
+        try:
+            while True:
+                try:
+                    return optimize()
+                except _Restart:
+                    continue
+        finally:
+            self._fixed = False
+
+
+class FedPowerMultiServer(FedPowerServer):
+    # Fits all features of FedPowerMultiClient clients in one session. Every
+    # round requests one row of lambdas per feature that has not converged
+    # (NaN rows for the others) and the features are optimized together by
+    # batch_brent, so a session lasts as many rounds as its slowest feature
+
+    def __init__(self, power, clients, backend="serial", deadline=None, quorum=1.0):
+        super().__init__(power, clients, backend, deadline, quorum)
+        n_features = {client.n_features for client in clients}
+        if len(n_features) != 1:
+            raise ValueError("clients must hold the same number of features")
+        self.n_features = n_features.pop()
+
+    def _per_feature(self, lmb, var_comp, variance):
+        # (c, n, logvar) of the requested features, one row each
+        responses = self._collect(lmb, var_comp, self.compression)
+        requested = np.flatnonzero(~np.any(np.isnan(lmb), axis=1))
+        results = [
+            variance(lmb[j], [_unstack(response, i) for response in responses])
+            for i, j in enumerate(requested)
+        ]
+        return tuple(np.array(a) for a in zip(*results))
+
+    def naive_variance(self, lmb):
+        return self._per_feature(lmb, "naive", self._naive_variance)
+
+    def pairwise_variance(self, lmb):
+        return self._per_feature(lmb, "pairwise", self._pairwise_variance)
+
+    def llf(self, lmb, var_comp="pairwise"):
+        # llf with one row of lambdas per feature, NaN where not requested
+        lmb = np.asarray(lmb, dtype=np.float64)
+        if lmb.ndim != 2 or lmb.shape[0] != self.n_features:
+            raise ValueError("lmb must be a 2D array with one row per feature")
+
+        requested = ~np.any(np.isnan(lmb), axis=1)
+        c, n, logvar = self.aggregate(lmb, var_comp)
+        ll = np.full(lmb.shape, np.nan)
+        ll[requested] = (lmb[requested] - 1) * c[:, None] - n[:, None] / 2 * logvar
+        return ll
+
+    def mle(self, brack=(-2, 2), var_comp="pairwise", optimize="brent", full_output=0):
+        if optimize != "brent":
+            raise ValueError("multi-feature sessions only support optimize='brent'")
+
+        def _run():
+            start = len(self.trace)
+            nll = np.full(self.n_features, np.inf)
+
+            def _neg_llf(lmb, idx):
+                request = np.full((self.n_features, 1), np.nan)
+                request[idx, 0] = lmb
+                f = -self.llf(request, var_comp)[idx, 0]
+                nll[idx] = np.minimum(nll[idx], f)  # brent ends at the best point
+                return f
+
+            lmb = batch_brent(
+                _neg_llf, [np.full(self.n_features, b, np.float64) for b in brack]
             )
+            if full_output:
+                return lmb, nll, len(self.trace) - start
+            return lmb
+
+        return self._session(_run)
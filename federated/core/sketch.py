@@ -0,0 +1,105 @@
+import numpy as np
+from scipy.special import logsumexp
+from numerical.optimize.prepared import BoxCoxData, YeoJohnsonData
+
+_MAX_BINS = 256  # nonempty bins per sign in a client sketch
+_MIN_EXP = -20  # the finest bins have width 2^-20
+
+
+def _bin_stats(keys, count, mean, M2):
+    # Merge rows with equal keys, the means and centered sums by Chan's formula
+    keys, inv = np.unique(keys, return_inverse=True)
+    total = np.bincount(inv, count, len(keys))
+    merged = np.bincount(inv, count * mean, len(keys)) / total
+    M2 = np.bincount(inv, M2 + count * (mean - merged[inv]) ** 2, len(keys))
+    return keys, total, merged, M2
+
+
+def _coarsen(sketch, exp):
+    # The bins of a sketch on the grid of width 2^exp >= its own width
+    e, keys, count, mean, M2 = sketch
+    return _bin_stats(keys // 2 ** (exp - e), count, mean, M2)
+
+
+def log_sketch(logx, max_bins=_MAX_BINS):
+    # Histogram of logx on the bins [k, k + 1) * 2^e as (e, keys, count, mean,
+    # M2) with the count, mean and centered sum of each nonempty bin. The
+    # width is the finest power of two with at most max_bins nonempty bins,
+    # so any two sketches merge on the coarser of their grids
+    if max_bins < 1:
+        raise ValueError("max_bins must be a positive integer")
+
+    logx = np.asarray(logx, dtype=np.float64)
+    e = _MIN_EXP
+    if len(logx) > 0 and np.ptp(logx) > 0:
+        e = max(e, int(np.ceil(np.log2(np.ptp(logx) / max_bins))))
+
+    ones = np.ones_like(logx)
+    while True:
+        keys = np.floor(logx / 2.0**e).astype(np.int64)
+        sketch = (e, *_bin_stats(keys, ones, logx, np.zeros_like(logx)))
+        if len(sketch[1]) <= max_bins:
+            return sketch
+        e += 1
+
+
+def merge_sketches(responses):
+    # (n_zero, {part: sketch}) of all clients merged on the coarsest grid
+    n_zero, parts = 0, {}
+    for n_zero_i, parts_i in responses:
+        n_zero += n_zero_i
+        for part, sketch in parts_i.items():
+            parts.setdefault(part, []).append(sketch)
+
+    merged = {}
+    for part, sketches in parts.items():
+        exp = max(sketch[0] for sketch in sketches)
+        keys, count, mean, M2 = (
+            np.concatenate(a) for a in zip(*(_coarsen(s, exp) for s in sketches))
+        )
+        merged[part] = (exp, *_bin_stats(keys, count, mean, M2))
+    return n_zero, merged
+
+
+def sketch_data(power, n_zero, parts):
+    # Bin centroids weighted by their counts, c and n are exact
+    if power == "boxcox":
+        _, _, count, mean, _ = parts["pos"]
+        return BoxCoxData(np.exp(mean), sample_weight=count, compress=False)
+
+    x, w = [np.zeros(1)], [np.array([n_zero], dtype=np.float64)]
+    for part, sign in (("pos", 1.0), ("neg", -1.0)):
+        if part in parts:
+            _, _, count, mean, _ = parts[part]
+            x.append(sign * np.expm1(mean))
+            w.append(count)
+    return YeoJohnsonData(np.concatenate(x), np.concatenate(w), compress=False)
+
+
+def sketch_error(parts, lmb, logvar, n):
+    # Bound of |llf - llf of the sketch| at lmb. The sketch keeps the between
+    # bin sum B = sum_b count_b (psi(mean_b) - mean)^2, while n * var is the
+    # between bin sum of the bin means of psi plus the within bin sums W_b,
+    # with psi' = e^(t * log) (t = 2 - lmb for "neg") bounded on each bin:
+    # min psi'^2 M2_b <= W_b <= max psi'^2 M2_b and a bin mean of psi is
+    # within max|psi''| / 2 * M2_b / count_b of psi(mean_b), E in total
+    log_wmin, log_wmax, log_e = [], [], []
+    for part, (e, keys, count, _, M2) in parts.items():
+        t = 2 - lmb if part == "neg" else lmb
+        lo, hi = keys * 2.0**e, (keys + 1) * 2.0**e
+        t_lo, t_hi = np.minimum(t * lo, t * hi), np.maximum(t * lo, t * hi)
+        with np.errstate(divide="ignore"):
+            log_M2, log_t = np.log(M2), np.log(abs(t))
+        log_wmin.append(2 * t_lo + log_M2)
+        log_wmax.append(2 * t_hi + log_M2)
+        log_e.append(2 * (log_t + t_hi + log_M2 - np.log(2)) - np.log(count))
+
+    log_b = logvar + np.log(n)
+    log_wmin, log_wmax = (logsumexp(np.concatenate(a)) for a in (log_wmin, log_wmax))
+    log_e = logsumexp(np.concatenate(log_e)) / 2
+
+    # B_true is within (sqrt(B) -+ E)^2
+    rel_e = np.exp(log_e - log_b / 2)
+    upper = np.log((1 + rel_e) ** 2 + np.exp(log_wmax - log_b))
+    lower = np.log(max(1 - rel_e, 0.0) ** 2 + np.exp(log_wmin - log_b))
+    return n / 2 * max(upper, -lower)
@@ -0,0 +1,89 @@
+import numpy as np
+
+_gold = 1.618034  # growth of the bracket as in scipy.optimize.bracket
+_cg = 0.3819660  # golden section ratio used by scipy.optimize.brent
+_mintol = 1.0e-11  # same as scipy.optimize.brent
+
+
+def _vertex(x, f):
+    # Minimum of the parabola through three points, NaN unless it is convex
+    order = np.argsort(x)
+    (x0, x1, x2), (f0, f1, f2) = x[order], f[order]
+    if not x0 < x1 < x2:
+        return np.nan
+    if not (f2 - f1) / (x2 - x1) > (f1 - f0) / (x1 - x0):
+        return np.nan
+    r = (x1 - x0) * (f1 - f2)
+    q = (x1 - x2) * (f1 - f0)
+    return x1 - ((x1 - x2) * q - (x1 - x0) * r) / (2 * (q - r))
+
+
+def speculative_brent(
+    func, args=(), brack=(-2, 2), spread=0.03, tol=1.48e-8, maxiter=500, full_output=0
+):
+    # Minimize a 1D function in rounds of a few points, func(x, *args)
+    # evaluates an array of points at once. Each round sends Brent's next
+    # candidate, the vertex u of the parabola through the three best points,
+    # with u -+ spread * |u - x| around it (x the best point so far) and the
+    # golden section points of both sides of x as speculative alternatives.
+    # The bracket then shrinks to the neighbours of the best point evaluated
+
+    # A 2-point brack is split at its midpoint, a 3-point one is used as is
+    xs = np.sort(np.asarray(brack, dtype=np.float64))
+    if len(xs) == 2:
+        xs = np.r_[xs[0], xs.mean(), xs[1]]
+    elif len(xs) != 3:
+        raise ValueError("Bracketing interval must be length 2 or 3 sequence.")
+    fs = np.asarray(func(xs, *args), dtype=np.float64)
+    n_rounds = 1
+
+    # Bracket the minimum, three growing steps per round downhill
+    while np.argmin(fs) in (0, len(xs) - 1) and n_rounds < maxiter:
+        if np.argmin(fs) == 0:
+            step = xs[0] - xs[1]
+            grow = xs[0] + step * _gold ** np.arange(1, 4)
+        else:
+            step = xs[-1] - xs[-2]
+            grow = xs[-1] + step * _gold ** np.arange(1, 4)
+        xs = np.r_[xs, grow]
+        fs = np.r_[fs, func(grow, *args)]
+        order = np.argsort(xs)
+        xs, fs = xs[order], fs[order]
+        n_rounds += 1
+
+    for _ in range(maxiter):
+        i = np.argmin(fs)
+        x, a, c = xs[i], xs[max(i - 1, 0)], xs[min(i + 1, len(xs) - 1)]
+        tol1 = tol * abs(x) + _mintol
+        tol2 = 2.0 * tol1
+        if max(x - a, c - x) <= tol2:
+            break
+
+        def _new(points):
+            # Points inside the bracket and apart from the known ones, by
+            # tol1 / 2 so that x -+ tol1 are never rounded away
+            points = np.unique(np.clip(points, a + tol1, c - tol1))
+            return points[np.min(abs(points[:, None] - xs), axis=1) >= tol1 / 2]
+
+        best = np.argsort(fs)[:3]
+        u = _vertex(xs[best], fs[best])
+        s = max(spread * abs(u - x), tol1)
+        model = _new([u - s, u, u + s]) if a < u < c else np.empty(0)
+        if len(model) == 0:
+            # The model is unusable or has converged, close the bracket on x
+            model = _new([x - tol1, x + tol1])
+
+        points = np.union1d(_new([x - _cg * (x - a), x + _cg * (c - x)]), model)
+        if len(points) == 0:
+            break
+
+        xs = np.r_[xs, points]
+        fs = np.r_[fs, func(points, *args)]
+        order = np.argsort(xs)
+        xs, fs = xs[order], fs[order]
+        n_rounds += 1
+
+    i = np.argmin(fs)
+    if full_output:
+        return xs[i], fs[i], n_rounds
+    return xs[i]
@@ -0,0 +1,374 @@
+# Message-based transport of the federated protocol. The server sends a batch
+# of lambdas, each client answers with its statistics (c, n, item1, item2).
+# Messages are framed by a 5-byte header (type, payload length) and carry
+# little-endian arrays, the complex phase marking negative values in item1
+# is sent as a packed sign bit per lambda. A request may ask for compressed
+# statistics, the response header tells how its body is encoded.
+
+import os
+import asyncio
+import socket
+import socketserver
+import struct
+import tempfile
+import zlib
+import multiprocessing as mp
+import numpy as np
+from .client import FedPowerClient
+from .codec import Compression, _PRECISIONS
+
+_HEADER = struct.Struct("!BI")  # message type, payload length
+# var_comp, scalar lmb, precision, delta, zlib level
+_REQUEST = struct.Struct("!BBBBB")
+# power, scalar, signed, precision, delta, zlib level, number of lambdas,
+# c, n_pos (or n), n_neg
+_RESPONSE = struct.Struct("!BBBBBBIddd")
+
+_MSG_LLF, _MSG_STATS, _MSG_ERROR = 1, 2, 3
+_VAR_COMPS = ["pairwise", "naive"]
+_POWERS = ["boxcox", "yeojohnson"]
+_FLOAT64 = Compression("float64", delta=False, level=0)
+
+
+def _codec(compression):
+    return _FLOAT64 if compression is None else compression
+
+
+def encode_request(lmb, var_comp, compression=None):
+    if var_comp not in _VAR_COMPS:
+        raise ValueError(f"var_comp must be one of {_VAR_COMPS} over the transport")
+    lmb_arr = np.atleast_1d(np.asarray(lmb, dtype="<f8"))
+    codec = _codec(compression)
+    head = _REQUEST.pack(
+        _VAR_COMPS.index(var_comp),
+        np.isscalar(lmb),
+        _PRECISIONS.index(codec.precision),
+        codec.delta,
+        codec.level,
+    )
+    return head + lmb_arr.tobytes()
+
+
+def decode_request(payload):
+    var_comp, scalar, precision, delta, level = _REQUEST.unpack_from(payload)
+    lmb = np.frombuffer(payload, dtype="<f8", offset=_REQUEST.size)
+    compression = None
+    if precision > 0 or delta or level > 0:
+        compression = Compression(_PRECISIONS[precision], delta, level)
+    return (lmb[0] if scalar else lmb.copy()), _VAR_COMPS[var_comp], compression
+
+
+def encode_response(power, response, compression=None):
+    if power == "boxcox":
+        c, n_pos, item1, item2 = response
+        n_neg = 0
+    else:
+        c, n_pos, n_neg, item1, item2 = response
+
+    scalar = np.ndim(item1) == 0
+    item1, item2 = np.atleast_1d(item1), np.atleast_1d(item2)
+    signed = np.iscomplexobj(item1)
+    codec = _codec(compression)
+
+    head = _RESPONSE.pack(
+        _POWERS.index(power),
+        scalar,
+        signed,
+        _PRECISIONS.index(codec.precision),
+        codec.delta,
+        codec.level,
+        len(item1),
+        c,
+        n_pos,
+        n_neg,
+    )
+    body = codec.pack(np.real(item1)) + codec.pack(item2)
+    if signed:
+        body += np.packbits(np.cos(np.imag(item1)) < 0).tobytes()
+    if codec.level > 0:
+        body = zlib.compress(body, codec.level)
+    return head + body
+
+
+def request_size(n_lmb):
+    # Bytes on the wire of a request for n_lmb lambdas
+    return _HEADER.size + _REQUEST.size + 8 * n_lmb
+
+
+def response_size(n_lmb, signed):
+    # Bytes on the wire of an uncompressed response for n_lmb lambdas
+    return _HEADER.size + _RESPONSE.size + 16 * n_lmb + signed * -(-n_lmb // 8)
+
+
+def dstats_size(n_lmb):
+    # Bytes on the wire of derivative statistics for n_lmb lambdas, a shift,
+    # a log scale and six moments per lambda as float64
+    return _HEADER.size + _RESPONSE.size + 8 + 56 * n_lmb
+
+
+def sketch_size(n_bins):
+    # Bytes on the wire of a sketch with n_bins bins per part, an exponent
+    # and a bin count per part, then a key (int32), count, mean and M2 per bin
+    return _HEADER.size + _RESPONSE.size + sum(5 + 28 * k for k in n_bins)
+
+
+def compressed_size(power, response, compression):
+    # Bytes on the wire of response sent with compression
+    return _HEADER.size + len(encode_response(power, response, compression))
+
+
+def _count(n):
+    # Counts travel as float64, integral ones are restored as int
+    return int(n) if float(n).is_integer() else n
+
+
+def decode_response(payload):
+    head = _RESPONSE.unpack_from(payload)
+    power, scalar, signed, precision, delta, level, k, c, n_pos, n_neg = head
+    codec = Compression(_PRECISIONS[precision], delta, level)
+    body = payload[_RESPONSE.size :]
+    if level > 0:
+        body = zlib.decompress(body)
+
+    size = codec.dtype.itemsize * k
+    item1 = codec.unpack(body, k)
+    item2 = codec.unpack(body, k, offset=size)
+    if signed:
+        neg = np.unpackbits(np.frombuffer(body, np.uint8, offset=2 * size), count=k)
+        item1 = item1 + np.pi * 1j * neg
+
+    if scalar:
+        item1, item2 = item1[0], item2[0]
+
+    if _POWERS[power] == "boxcox":
+        return c, _count(n_pos), item1, item2
+    return c, _count(n_pos), _count(n_neg), item1, item2
+
+
+def _recv_exact(sock, size):
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise ConnectionError("connection closed")
+        buf += chunk
+    return bytes(buf)
+
+
+def send_message(sock, msg_type, payload):
+    data = _HEADER.pack(msg_type, len(payload)) + payload
+    sock.sendall(data)
+    return len(data)
+
+
+def recv_message(sock):
+    msg_type, size = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    return msg_type, _recv_exact(sock, size), _HEADER.size + size
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    # Answers requests on one connection until the peer closes it
+
+    def handle(self):
+        client = self.server.client
+        while True:
+            try:
+                msg_type, payload, _ = recv_message(self.request)
+            except ConnectionError:
+                break
+
+            try:
+                lmb, var_comp, compression = decode_request(payload)
+                response = client.llf(lmb, var_comp)
+                send_message(
+                    self.request,
+                    _MSG_STATS,
+                    encode_response(client.power, response, compression),
+                )
+            except Exception as e:
+                send_message(self.request, _MSG_ERROR, repr(e).encode())
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+def make_client_server(client, address):
+    # Socket server answering for client, a (host, port) address is TCP,
+    # a path is a Unix socket
+    if isinstance(address, (str, os.PathLike)):
+        server = _UnixServer(os.fspath(address), _Handler)
+    else:
+        server = _TCPServer(tuple(address), _Handler)
+    server.client = client
+    return server
+
+
+def serve_client(client, address, conn=None):
+    # Serve client forever, the bound address is sent through conn when given
+    with make_client_server(client, address) as server:
+        if conn is not None:
+            conn.send(server.server_address)
+            conn.close()
+        server.serve_forever()
+
+
+class RemoteClient:
+    # Proxy of a client served at address, with the llf interface of
+    # FedPowerClient and its coroutine allf. The connection is opened once
+    # and reused across rounds
+
+    def __init__(self, address, timeout=None):
+        self.address = address
+        self.timeout = timeout
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.n_requests = 0
+        self._sock = None
+        self._stream = None  # (reader, writer) of allf, bound to its loop
+
+    def _connect(self):
+        if isinstance(self.address, (str, os.PathLike)):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(os.fspath(self.address))
+        else:
+            sock = socket.create_connection(tuple(self.address), self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    def llf(self, lmb, var_comp="pairwise", compression=None):
+        if self._sock is None:
+            self._sock = self._connect()
+
+        try:
+            self.bytes_sent += send_message(
+                self._sock, _MSG_LLF, encode_request(lmb, var_comp, compression)
+            )
+            msg_type, payload, size = recv_message(self._sock)
+        except (OSError, ConnectionError):
+            self.close()
+            raise
+        return self._response(msg_type, payload, size)
+
+    def _response(self, msg_type, payload, size):
+        self.bytes_received += size
+        self.n_requests += 1
+
+        if msg_type == _MSG_ERROR:
+            raise RuntimeError(f"client at {self.address}: {payload.decode()}")
+        return decode_response(payload)
+
+    async def _aconnect(self):
+        if isinstance(self.address, (str, os.PathLike)):
+            connect = asyncio.open_unix_connection(os.fspath(self.address))
+        else:
+            connect = asyncio.open_connection(*self.address)  # TCP_NODELAY is set
+        return await asyncio.wait_for(connect, self.timeout)
+
+    async def allf(self, lmb, var_comp="pairwise", compression=None):
+        # llf over asyncio streams for AsyncioBackend, the connection is kept
+        # across calls made in the same event loop
+        if self._stream is None:
+            self._stream = await self._aconnect()
+        reader, writer = self._stream
+
+        try:
+            payload = encode_request(lmb, var_comp, compression)
+            writer.write(_HEADER.pack(_MSG_LLF, len(payload)) + payload)
+            await writer.drain()
+            self.bytes_sent += _HEADER.size + len(payload)
+
+            msg_type, size = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+            payload = await reader.readexactly(size)
+        except (OSError, ConnectionError, asyncio.IncompleteReadError):
+            self._aclose()
+            raise
+        except asyncio.CancelledError:
+            # A late call is given up, its answer must not be read next time
+            self._aclose()
+            raise
+        return self._response(msg_type, payload, _HEADER.size + size)
+
+    def _aclose(self):
+        if self._stream is not None:
+            self._stream[1].close()
+            self._stream = None
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+        self._aclose()
+
+    def __getstate__(self):
+        # Sockets are not shared, a copy reconnects on first use
+        state = self.__dict__.copy()
+        state["_sock"] = None
+        state["_stream"] = None
+        return state
+
+
+def _serve_data(power, x, address, conn):
+    serve_client(FedPowerClient(power, x), address, conn)
+
+
+class LocalNetwork:
+    # Stand-in network: every client runs in its own local process behind
+    # a TCP ("tcp") or Unix ("unix") socket, self.clients are their proxies
+
+    def __init__(self, power, x_clients, family="unix"):
+        if family not in ("tcp", "unix"):
+            raise ValueError("family must be either 'tcp' or 'unix'")
+
+        self._tmpdir = tempfile.mkdtemp() if family == "unix" else None
+        self._procs = []
+        self.clients = []
+
+        for i, x in enumerate(x_clients):
+            if family == "unix":
+                address = os.path.join(self._tmpdir, f"client-{i}.sock")
+            else:
+                address = ("127.0.0.1", 0)  # any free port
+
+            conn, child = mp.Pipe()
+            proc = mp.Process(
+                target=_serve_data, args=(power, x, address, child), daemon=True
+            )
+            proc.start()
+            child.close()
+            self._procs.append(proc)
+            self.clients.append(RemoteClient(conn.recv()))
+            conn.close()
+
+    @property
+    def bytes_sent(self):
+        return sum(client.bytes_sent for client in self.clients)
+
+    @property
+    def bytes_received(self):
+        return sum(client.bytes_received for client in self.clients)
+
+    def close(self):
+        for client in self.clients:
+            client.close()
+        for proc in self._procs:
+            proc.terminate()
+            proc.join()
+        self._procs = []
+        if self._tmpdir is not None:
+            for name in os.listdir(self._tmpdir):
+                os.unlink(os.path.join(self._tmpdir, name))
+            os.rmdir(self._tmpdir)
+            self._tmpdir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,6 +1,18 @@
+import time
+import numpy as np
 from argparse import ArgumentParser
 from dataloader import load_data
-from core import FedPowerClient, FedPowerServer, IID_partitioner
+from core import (
+    FedPowerClient,
+    FedPowerMultiClient,
+    FedPowerServer,
+    FedPowerMultiServer,
+    EdgeAggregator,
+    IID_partitioner,
+    LocalNetwork,
+    get_backend,
+    Compression,
+)
 
 
 def parse_arguments():
@@ -20,7 +32,10 @@ def parse_arguments():
         help="Dataset name",
     )
     parser.add_argument(
-        "--feature", type=str, default="0", help="Feature index or name"
+        "--feature",
+        type=str,
+        default="0",
+        help="Feature index or name, 'all' fits every feature in one session",
     )
     parser.add_argument(
         "--var_comp",
@@ -33,7 +48,7 @@ def parse_arguments():
         "--optimize",
         type=str,
         default="brent",
-        choices=["brent", "grid"],
+        choices=["brent", "grid", "speculative", "newton", "sketch"],
         help="Optimization method",
     )
     parser.add_argument(
@@ -55,6 +70,58 @@ def parse_arguments():
         choices=[0, 1],
         help="Print output or not",
     )
+    parser.add_argument(
+        "--backend",
+        type=str,
+        default="serial",
+        choices=["serial", "thread", "process", "asyncio"],
+        help="Execution backend for client evaluation",
+    )
+    parser.add_argument(
+        "--n_workers",
+        type=int,
+        default=None,
+        help="Number of workers of the thread or process backend",
+    )
+    parser.add_argument(
+        "--transport",
+        type=str,
+        default="none",
+        choices=["none", "unix", "tcp"],
+        help="Run clients as local processes behind sockets",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        default=None,
+        help="Seconds a round waits for clients, late clients are excluded",
+    )
+    parser.add_argument(
+        "--quorum",
+        type=float,
+        default=1.0,
+        help="Minimum fraction of clients answering in time",
+    )
+    parser.add_argument(
+        "--n_edges",
+        type=int,
+        default=0,
+        help="Number of edge aggregators between clients and server, 0 for none",
+    )
+    parser.add_argument(
+        "--compression",
+        type=str,
+        default="none",
+        choices=["none", "float32", "bfloat16"],
+        help="Precision of compressed client statistics (delta coded and zlib)",
+    )
+    parser.add_argument(
+        "--refine",
+        type=int,
+        default=0,
+        choices=[0, 1],
+        help="Refine the sketch fit with one round of derivative statistics",
+    )
     return parser.parse_args()
 
 
@@ -69,25 +136,91 @@ def run_simulation(
     full_output,
     n_reps,
     print_output,
+    backend="serial",
+    n_workers=None,
+    transport="none",
+    deadline=None,
+    quorum=1.0,
+    n_edges=0,
+    compression="none",
+    refine=0,
 ):
     strictly_positive = True if power == "boxcox" else False
     X, _ = load_data(dataset, strictly_positive)
 
-    if feature.isdigit():
-        col = X.columns[int(feature)]
+    if compression != "none" and (feature == "all" or n_edges > 0):
+        raise ValueError("compression requires a single feature and no edges")
+    codec = None if compression == "none" else Compression(compression)
+    if transport != "none" and backend == "process":
+        # Worker processes hold copies of the proxies, their byte counters
+        # never reach the network of this process
+        raise ValueError(
+            "a transport requires backend 'serial', 'thread' or 'asyncio'"
+        )
+    if optimize in ("newton", "sketch") and (
+        transport != "none" or n_edges > 0 or compression != "none"
+    ):
+        raise ValueError(
+            f"{optimize} requires transport 'none', no edges and no compression"
+        )
+
+    if feature == "all":
+        # All features are fitted in one session
+        if transport != "none" or n_edges > 0 or optimize != "brent":
+            raise ValueError(
+                "feature 'all' requires transport 'none', no edges and brent"
+            )
+        data = X.to_numpy(dtype=np.float64)
+    elif feature.isdigit():
+        data = X[X.columns[int(feature)]]
     else:
-        col = feature
+        data = X[feature]
 
     results = []
 
     for i in range(n_reps):
-        x_clients = IID_partitioner(X[col], n_clients, rng=i)
+        x_clients = IID_partitioner(data, n_clients, rng=i)
 
-        clients = [FedPowerClient(power, x) for x in x_clients]
-        server = FedPowerServer(power, clients)
+        if feature == "all":
+            network = None
+            clients = [FedPowerMultiClient(power, x) for x in x_clients]
+        elif transport == "none":
+            network = None
+            clients = [FedPowerClient(power, x) for x in x_clients]
+        else:
+            network = LocalNetwork(power, x_clients, family=transport)
+            clients = network.clients
+        if n_edges > 0:
+            # Clients are split evenly among the edges in order
+            bounds = np.linspace(0, len(clients), n_edges + 1).astype(int)
+            clients = [
+                EdgeAggregator(power, clients[a:b])
+                for a, b in zip(bounds[:-1], bounds[1:])
+            ]
+        if feature == "all":
+            server = FedPowerMultiServer(
+                power,
+                clients,
+                get_backend(backend, n_workers),
+                deadline=deadline,
+                quorum=quorum,
+            )
+        else:
+            server = FedPowerServer(
+                power,
+                clients,
+                get_backend(backend, n_workers),
+                deadline=deadline,
+                quorum=quorum,
+                compression=codec,
+            )
+        start = time.perf_counter()
 
         if full_output:
-            if optimize == "brent":
+            if feature == "all":
+                lmb, nll, n_rounds = server.mle(var_comp=var_comp, full_output=1)
+
+            elif optimize == "brent":
                 lmb, nll, _, n_rounds = server.mle(
                     var_comp=var_comp,
                     optimize="brent",
@@ -102,19 +235,53 @@ def run_simulation(
                     full_output=1,
                 )
 
-            results.append((lmb, nll, n_rounds))
+            elif optimize == "speculative":
+                lmb, nll, n_rounds = server.mle(
+                    var_comp=var_comp, optimize="speculative", full_output=1
+                )
+
+            elif optimize == "newton":
+                lmb, nll, n_rounds = server.mle(optimize="newton", full_output=1)
+
+            elif optimize == "sketch":
+                lmb, nll, n_rounds = server.sketch_mle(refine=refine, full_output=1)
+
+            results.append((lmb, nll, n_rounds, server.trace))
             if print_output:
                 print(f"lmb: {lmb}, nll: {nll}, n_rounds: {n_rounds}")
 
         else:
-            lmb = server.mle(
-                var_comp=var_comp, optimize=optimize, n_points=n_points, full_output=0
-            )
+            if feature == "all":
+                lmb = server.mle(var_comp=var_comp, full_output=0)
+            elif optimize == "sketch":
+                lmb = server.sketch_mle(refine=refine)
+            else:
+                lmb = server.mle(
+                    var_comp=var_comp,
+                    optimize=optimize,
+                    n_points=n_points,
+                    full_output=0,
+                )
 
             results.append((lmb,))
             if print_output:
                 print(f"lmb: {lmb}")
 
+        if (codec is not None or optimize == "sketch") and print_output:
+            print(f"lmb error bound: {server.lmb_error}")
+        if deadline is not None and print_output:
+            print(f"participants: {server.participants.tolist()}")
+
+        server.backend.close()
+        if network is not None:
+            if print_output:
+                print(
+                    f"wall time: {time.perf_counter() - start:.3f}s, "
+                    f"bytes sent: {network.bytes_sent}, "
+                    f"bytes received: {network.bytes_received}"
+                )
+            network.close()
+
     return results
 
 
@@ -132,4 +299,12 @@ if __name__ == "__main__":
         full_output=args.full_output,
         n_reps=args.n_reps,
         print_output=args.print_output,
+        backend=args.backend,
+        n_workers=args.n_workers,
+        transport=args.transport,
+        deadline=args.deadline,
+        quorum=args.quorum,
+        n_edges=args.n_edges,
+        compression=args.compression,
+        refine=args.refine,
     )
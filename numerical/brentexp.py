@@ -15,10 +15,9 @@ from dataloader import load_data
 
 def plot_deriv(power, lmbs, x, true_deriv, ax):
     with np.errstate(all="ignore"):
-        dnll = [dnll_dlmb(power, l, x, true_deriv) for l in lmbs]
-    for idx, deriv in enumerate(dnll):
-        if not np.isfinite(deriv):
-            ax.axvline(lmbs[idx], linestyle="-", color="blanchedalmond")
+        dnll = dnll_dlmb(power, lmbs, x, true_deriv)
+    for l in np.asarray(lmbs)[~np.isfinite(dnll)]:
+        ax.axvline(l, linestyle="-", color="blanchedalmond")
 
     if true_deriv:
         label = r"$\partial\text{NLL} / \partial\lambda$"
@@ -71,11 +70,11 @@ def main(power, X, dataset, feature, lmbs_nll, lmbs_dnll):
     x = X[feature]
 
     if power == "boxcox":
-        nll = [-boxcox_llf(l, x) for l in lmbs_nll]
+        nll = -boxcox_llf(lmbs_nll, x)
         lmb_brent = boxcox_mle(x)
 
     elif power == "yeojohnson":
-        nll = [-yeojohnson_llf(l, x) for l in lmbs_nll]
+        nll = -yeojohnson_llf(lmbs_nll, x)
         lmb_brent = yeojohnson_mle(x)
 
     with np.errstate(all="ignore"):
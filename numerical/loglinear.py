@@ -13,19 +13,19 @@ def main(power, X, dataset, feature, lmbs):
 
     if power == "boxcox":
         lmb_log = boxcox_mle(x, var_comp="log")
-        nll_log = [-boxcox_llf(l, x, "log") for l in lmbs]
+        nll_log = -boxcox_llf(lmbs, x, "log")
 
         with np.errstate(all="ignore"):
             lmb_linear = boxcox_mle(x, var_comp="linear")
-            nll_linear = [-boxcox_llf(l, x, "linear") for l in lmbs]
+            nll_linear = -boxcox_llf(lmbs, x, "linear")
 
     elif power == "yeojohnson":
         lmb_log = yeojohnson_mle(x, var_comp="log")
-        nll_log = [-yeojohnson_llf(l, x, "log") for l in lmbs]
+        nll_log = -yeojohnson_llf(lmbs, x, "log")
 
         with np.errstate(all="ignore"):
             lmb_linear = yeojohnson_mle(x, var_comp="linear")
-            nll_linear = [-yeojohnson_llf(l, x, "linear") for l in lmbs]
+            nll_linear = -yeojohnson_llf(lmbs, x, "linear")
 
     for idx, nll in enumerate(nll_linear):
         if not np.isfinite(nll):
@@ -1,9 +1,16 @@
-from .expsearch import power_expsearch, dnll_dlmb
+from .expsearch import power_expsearch, power_kary_expsearch, dnll_dlmb
 from .logcomp import (
     boxcox_llf,
     boxcox_mle,
+    boxcox_mle_batch,
     boxcox_constranined_lmax,
     yeojohnson_llf,
     yeojohnson_mle,
+    yeojohnson_mle_batch,
     yeojohnson_constranined_lmax,
 )
+from .prepared import BoxCoxData, YeoJohnsonData, BoxCoxColumns, YeoJohnsonColumns
+from .stream import BoxCoxStream, YeoJohnsonStream
+from .online import BoxCoxOnline, YeoJohnsonOnline
+from .parallel import boxcox_mle_parallel, yeojohnson_mle_parallel
+from .transformer import StablePowerTransformer
@@ -0,0 +1,182 @@
+# Vectorized versions of scipy.optimize.bracket and scipy.optimize.brent
+# minimizing many independent 1D functions at once. func(x, idx, *args)
+# evaluates problems idx at points x (one point per problem), brackets are
+# 1D arrays with one entry per problem. Problems that converge leave the
+# active set, the others advance together in one array pass.
+
+import numpy as np
+
+_gold = 1.618034  # golden ratio used by scipy.optimize.bracket
+_cg = 0.3819660  # golden section ratio used by scipy.optimize.brent
+_verysmall_num = 1e-21
+_mintol = 1.0e-11
+
+
+def batch_bracket(func, xa, xb, args=(), grow_limit=110.0, maxiter=1000):
+    # Bracket the minimum of every problem, same steps as scipy.optimize.bracket
+    xa, xb = np.array(xa, dtype=np.float64), np.array(xb, dtype=np.float64)
+    idx = np.arange(xa.shape[0])
+
+    fa = func(xa, idx, *args)
+    fb = func(xb, idx, *args)
+
+    swap = fa < fb  # Switch so fa > fb
+    xa, xb = np.where(swap, xb, xa), np.where(swap, xa, xb)
+    fa, fb = np.where(swap, fb, fa), np.where(swap, fa, fb)
+
+    xc = xb + _gold * (xb - xa)
+    fc = func(xc, idx, *args)
+
+    active = fc < fb
+    for _ in range(maxiter + 1):
+        if not np.any(active):
+            break
+
+        i = np.flatnonzero(active)
+        a, b, c = xa[i], xb[i], xc[i]
+        f_a, f_b, f_c = fa[i], fb[i], fc[i]
+
+        tmp1 = (b - a) * (f_b - f_c)
+        tmp2 = (b - c) * (f_b - f_a)
+        val = tmp2 - tmp1
+        denom = np.where(np.abs(val) < _verysmall_num, 2.0 * _verysmall_num, 2.0 * val)
+        w = b - ((b - c) * tmp2 - (b - a) * tmp1) / denom
+        wlim = b + grow_limit * (c - b)
+
+        # Parabolic step between b and c, limited parabolic step,
+        # or default golden magnification
+        case1 = (w - c) * (b - w) > 0.0
+        case2 = ~case1 & ((w - wlim) * (wlim - c) >= 0.0)
+        case3 = ~case1 & ~case2 & ((w - wlim) * (c - w) > 0.0)
+        case4 = ~case1 & ~case2 & ~case3
+
+        w = np.where(case2, wlim, w)
+        w = np.where(case4, c + _gold * (c - b), w)
+        fw = func(w, i, *args)
+
+        # Minimum between b and c
+        found_bw = case1 & (fw < f_c)
+        found_aw = case1 & ~found_bw & (fw > f_b)
+        done = found_bw | found_aw
+
+        # Step beyond c
+        shift_c = case3 & (fw < f_c)
+        b = np.where(shift_c, c, b)
+        f_b = np.where(shift_c, f_c, f_b)
+        c = np.where(shift_c, w, c)
+        f_c = np.where(shift_c, fw, f_c)
+
+        again = (case1 & ~done) | shift_c
+        if np.any(again):
+            w[again] = c[again] + _gold * (c[again] - b[again])
+            fw[again] = func(w[again], i[again], *args)
+
+        xa[i] = np.where(found_bw, b, np.where(done, a, b))
+        xb[i] = np.where(found_bw, w, np.where(done, b, c))
+        xc[i] = np.where(found_aw, w, np.where(done, c, w))
+        fa[i] = np.where(found_bw, f_b, np.where(done, f_a, f_b))
+        fb[i] = np.where(found_bw, fw, np.where(done, f_b, f_c))
+        fc[i] = np.where(found_aw, fw, np.where(done, f_c, fw))
+
+        active[i] = ~done & (fc[i] < fb[i])
+
+    if np.any(active):
+        raise RuntimeError(
+            "No valid bracket was found before the iteration limit was reached "
+            f"for problems {np.flatnonzero(active)}."
+        )
+
+    # Three conditions for a valid bracket
+    cond1 = ((fb < fc) & (fb <= fa)) | ((fb < fa) & (fb <= fc))
+    cond2 = ((xa < xb) & (xb < xc)) | ((xc < xb) & (xb < xa))
+    cond3 = np.isfinite(xa) & np.isfinite(xb) & np.isfinite(xc)
+    invalid = ~(cond1 & cond2 & cond3)
+    if np.any(invalid):
+        raise RuntimeError(
+            "The algorithm terminated without finding a valid bracket "
+            f"for problems {np.flatnonzero(invalid)}."
+        )
+
+    return xa, xb, xc, fa, fb, fc
+
+
+def batch_brent(func, brack, args=(), tol=1.48e-8, maxiter=500):
+    # Minimize every problem, same steps as scipy.optimize.brent
+    xa, xb, xc, _, fb, _ = batch_bracket(func, brack[0], brack[1], args)
+
+    x, w, v = xb.copy(), xb.copy(), xb.copy()
+    fx, fw, fv = fb.copy(), fb.copy(), fb.copy()
+    a, b = np.minimum(xa, xc), np.maximum(xa, xc)
+    deltax = np.zeros_like(x)
+    rat = np.zeros_like(x)
+
+    active = np.ones(x.shape, dtype=bool)
+    for _ in range(maxiter):
+        tol1 = tol * np.abs(x) + _mintol
+        tol2 = 2.0 * tol1
+        xmid = 0.5 * (a + b)
+
+        # Check for convergence
+        active &= np.abs(x - xmid) >= (tol2 - 0.5 * (b - a))
+        if not np.any(active):
+            break
+        i = np.flatnonzero(active)
+        x_i, a_i, b_i, xmid_i = x[i], a[i], b[i], xmid[i]
+        tol1_i, tol2_i = tol1[i], tol2[i]
+
+        # Parabolic step
+        tmp1 = (x_i - w[i]) * (fx[i] - fv[i])
+        tmp2 = (x_i - v[i]) * (fx[i] - fw[i])
+        p = (x_i - v[i]) * tmp2 - (x_i - w[i]) * tmp1
+        tmp2 = 2.0 * (tmp2 - tmp1)
+        p = np.where(tmp2 > 0.0, -p, p)
+        tmp2 = np.abs(tmp2)
+
+        dx_temp = deltax[i]
+        golden = np.abs(dx_temp) <= tol1_i
+        parabolic = (
+            ~golden
+            & (p > tmp2 * (a_i - x_i))
+            & (p < tmp2 * (b_i - x_i))
+            & (np.abs(p) < np.abs(0.5 * tmp2 * dx_temp))
+        )
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rat_p = p / tmp2
+        u = x_i + rat_p
+        near = ((u - a_i) < tol2_i) | ((b_i - u) < tol2_i)
+        rat_p = np.where(near, np.where(xmid_i - x_i >= 0, tol1_i, -tol1_i), rat_p)
+
+        # Golden section step if the parabolic step is not useful
+        deltax_i = np.where(golden, dx_temp, rat[i])
+        deltax_i = np.where(
+            parabolic, deltax_i, np.where(x_i >= xmid_i, a_i - x_i, b_i - x_i)
+        )
+        rat_i = np.where(parabolic, rat_p, _cg * deltax_i)
+
+        # Update by at least tol1
+        u = np.where(
+            np.abs(rat_i) < tol1_i,
+            np.where(rat_i >= 0, x_i + tol1_i, x_i - tol1_i),
+            x_i + rat_i,
+        )
+        fu = func(u, i, *args)
+
+        # Bigger than current
+        bigger = fu > fx[i]
+        shift_w = bigger & ((fu <= fw[i]) | (w[i] == x_i))
+        shift_v = bigger & ~shift_w & ((fu <= fv[i]) | (v[i] == x_i) | (v[i] == w[i]))
+
+        a[i] = np.where(bigger, np.where(u < x_i, u, a_i), np.where(u >= x_i, x_i, a_i))
+        b[i] = np.where(bigger, np.where(u < x_i, b_i, u), np.where(u >= x_i, b_i, x_i))
+
+        v_i = np.where(shift_w | ~bigger, w[i], np.where(shift_v, u, v[i]))
+        fv_i = np.where(shift_w | ~bigger, fw[i], np.where(shift_v, fu, fv[i]))
+        w_i = np.where(shift_w, u, np.where(bigger, w[i], x_i))
+        fw_i = np.where(shift_w, fu, np.where(bigger, fw[i], fx[i]))
+        v[i], fv[i], w[i], fw[i] = v_i, fv_i, w_i, fw_i
+        x[i] = np.where(bigger, x_i, u)
+        fx[i] = np.where(bigger, fx[i], fu)
+
+        deltax[i], rat[i] = deltax_i, rat_i
+
+    return x
@@ -3,74 +3,115 @@
 # https://arxiv.org/pdf/2210.01639.pdf
 
 import numpy as np
-from scipy.special import boxcox, log1p
-from scipy.stats._morestats import _yeojohnson_transform
+from scipy.special import log1p
 from scipy.optimize._zeros_py import _iter, _xtol, _rtol
+from .utils import _gen_lmb_slices
+
+
+def _lmb_col(lmb):
+    # A lmb array as a column, so results have one row per lmb
+    if np.ndim(lmb) == 0:
+        return lmb
+    return np.asarray(lmb, dtype=np.float64)[:, None]
+
+
+def _boxcox_deriv(lmb, x, logx):
+    # Box-Cox and its first-order derivative with respect to lmb
+    # from a single expm1, exp(lmb * logx) = em1 + 1
+    em1 = np.expm1(lmb * logx)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        y = np.where(abs(lmb) < np.spacing(1.0), logx, em1 / lmb)
+        dy = np.where(
+            abs(lmb) < np.spacing(1.0),
+            np.power(logx, 2) / 2,
+            ((em1 + 1) * logx - y) / lmb,
+        )
+    return y, dy
+
+
+def _yeojohnson_deriv(lmb, l, m):
+    # Yeo-Johnson and its first-order derivative with respect to lmb from
+    # l = log1p(x) of x >= 0 and m = log1p(-x) of x < 0, in this order
+    em1_pos, em1_neg = np.expm1(lmb * l), np.expm1((2 - lmb) * m)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # x >= 0
+        y_pos = np.where(abs(lmb) < np.spacing(1.0), l, em1_pos / lmb)
+        dy_pos = np.where(
+            abs(lmb) < np.spacing(1.0),
+            np.power(l, 2) / 2,
+            ((em1_pos + 1) * l - y_pos) / lmb,
+        )
+
+        # x < 0
+        y_neg = np.where(abs(lmb - 2) > np.spacing(1.0), -em1_neg / (2 - lmb), -m)
+        dy_neg = np.where(
+            abs(lmb - 2) < np.spacing(1.0),
+            np.power(m, 2) / 2,
+            ((em1_neg + 1) * m + y_neg) / (2 - lmb),
+        )
+
+    return np.concatenate([y_pos, y_neg], axis=-1), np.concatenate(
+        [dy_pos, dy_neg], axis=-1
+    )
 
 
 def dboxcox_dlmb(lmb, x):
-    # First-order derivative of Box-Cox with respect to lmb
-    if abs(lmb) < np.spacing(1.0):
-        return np.power(np.log(x), 2) / 2
-    else:  # lmb != 0
-        return (np.exp(lmb * np.log(x)) * np.log(x) - boxcox(x, lmb)) / lmb
+    # First-order derivative of Box-Cox with respect to lmb, one row per lmb
+    return _boxcox_deriv(_lmb_col(lmb), x, np.log(x))[1]
 
 
 def dyeojohnson_dlmb(lmb, x):
-    # First-order derivative of Yeo-Johnson with respect to lmb
-    out = np.zeros_like(x, dtype=np.float64)
+    # First-order derivative of Yeo-Johnson with respect to lmb, one row per lmb
+    lmb = _lmb_col(lmb)
     pos = x >= 0  # binary mask
+    _, dy = _yeojohnson_deriv(lmb, log1p(x[pos]), log1p(-x[~pos]))
 
-    # x >= 0
-    if abs(lmb) < np.spacing(1.0):
-        out[pos] = np.power(log1p(x[pos]), 2) / 2
-    else:  # lmb != 0
-        out[pos] = (
-            np.exp(lmb * log1p(x[pos])) * log1p(x[pos])
-            - _yeojohnson_transform(x[pos], lmb)
-        ) / lmb
-
-    # x < 0
-    if abs(lmb - 2) < np.spacing(1.0):
-        out[~pos] = np.power(log1p(-x[~pos]), 2) / 2
-    else:  # lmb != 2
-        out[~pos] = (
-            np.exp((2 - lmb) * log1p(-x[~pos])) * log1p(-x[~pos])
-            + _yeojohnson_transform(x[~pos], lmb)
-        ) / (2 - lmb)
-
+    out = np.empty(np.broadcast(x, lmb).shape)
+    out[..., pos] = dy[..., : np.count_nonzero(pos)]
+    out[..., ~pos] = dy[..., np.count_nonzero(pos) :]
     return out
 
 
 def dnll_dlmb(power, lmb, x, true_deriv=True):
-    # First-order derivative of NLL with respect to lmb
+    # First-order derivative of NLL with respect to lmb, a lmb array gives
+    # the derivative curve. The data invariants are computed once, then the
+    # lambdas go in chunks that bound the size of the (lambdas x n) blocks
     x = np.asarray(x, dtype=np.float64)
     x = x[~np.isnan(x)]
     n = len(x)
 
     if power == "boxcox":
-        sum_cons = np.sum(np.log(x))
-        y = boxcox(x, lmb)
-        dy_dlmb = dboxcox_dlmb(lmb, x)
+        logx = np.log(x)
+        sum_cons = np.sum(logx)
 
     elif power == "yeojohnson":
+        pos = x >= 0  # binary mask
+        l, m = log1p(x[pos]), log1p(-x[~pos])
         sum_cons = np.sum(np.sign(x) * log1p(np.abs(x)))
-        y = _yeojohnson_transform(x, lmb)
-        dy_dlmb = dyeojohnson_dlmb(lmb, x)
-
-    if true_deriv:
-        # True derivative
-        return (
-            1 / np.var(y) * (np.sum(y * dy_dlmb) - 1 / n * np.sum(y) * np.sum(dy_dlmb))
-            - sum_cons
-        )
-    else:
-        # Formula used in the SecureFedYJ paper
-        return (
-            n * np.sum(y * dy_dlmb)
-            - np.sum(y) * np.sum(dy_dlmb)
-            - sum_cons * n * np.var(y)
-        )
+
+    lmb_arr = np.atleast_1d(lmb).astype(np.float64)
+    dnll = np.empty(lmb_arr.shape)
+    for s in _gen_lmb_slices(len(lmb_arr), n):
+        if power == "boxcox":
+            y, dy_dlmb = _boxcox_deriv(lmb_arr[s, None], x, logx)
+        elif power == "yeojohnson":
+            y, dy_dlmb = _yeojohnson_deriv(lmb_arr[s, None], l, m)
+
+        sum_y = np.sum(y, axis=-1)
+        sum_dy = np.sum(dy_dlmb, axis=-1)
+        sum_y_dy = np.sum(y * dy_dlmb, axis=-1)
+        if true_deriv:
+            # True derivative
+            dnll[s] = (
+                1 / np.var(y, axis=-1) * (sum_y_dy - 1 / n * sum_y * sum_dy) - sum_cons
+            )
+        else:
+            # Formula used in the SecureFedYJ paper
+            dnll[s] = n * sum_y_dy - sum_y * sum_dy - sum_cons * n * np.var(y, axis=-1)
+
+    if np.ndim(lmb) == 0:
+        return dnll[0]
+    return dnll
 
 
 def exp_update(lmb, lmb_pos, lmb_neg, delta: int):
@@ -116,3 +157,91 @@ def power_expsearch(power, x, xtol=_xtol, rtol=_rtol, maxiter=_iter, true_deriv=
         lmb, lmb_pos, lmb_neg = exp_update(lmb, lmb_pos, lmb_neg, delta)
 
     return lmb
+
+
+_lmb_max = np.finfo(np.float64).max
+
+
+def _kary_probes(lmb_neg, lmb_pos, k):
+    # k lambdas evenly inside a finite bracket, otherwise growing from its
+    # finite end as exp_update does, k = 1 probes the same lambdas
+    if lmb_neg > -np.inf and lmb_pos < np.inf:
+        return np.linspace(lmb_neg, lmb_pos, k + 2)[1:-1]
+    elif lmb_neg > -np.inf:  # capped so that probes stay finite
+        return np.minimum(max(2 * lmb_neg, 1) * 2.0 ** np.arange(k), _lmb_max)
+    elif lmb_pos < np.inf:
+        return np.maximum(min(2 * lmb_pos, -1) * 2.0 ** np.arange(k)[::-1], -_lmb_max)
+
+    # First round: 0, 1, -1, 2, -2, 4, -4, ...
+    grow = 2.0 ** np.arange(k)
+    return np.sort(np.r_[0, np.ravel(np.c_[grow, -grow])][:k])
+
+
+def power_kary_expsearch(
+    power,
+    x,
+    k=4,
+    xtol=_xtol,
+    rtol=_rtol,
+    maxiter=_iter,
+    true_deriv=False,
+    full_output=0,
+):
+    # Exponential search probing the derivative sign at k lambdas per round,
+    # the bracket grows 2^k times per round and then shrinks k + 1 times.
+    # A probe that overflows counts as beyond the minimum, so the search stops
+    # at the edge of the representable lambdas instead of failing
+    if k < 1:
+        raise ValueError("k must be a positive integer")
+    x = np.asarray(x, dtype=np.float64)
+    x = x[~np.isnan(x)]
+
+    lmb_pos = np.inf
+    lmb_neg = -np.inf
+    lmb = 0
+
+    for i in range(maxiter):
+        probes = _kary_probes(lmb_neg, lmb_pos, k)
+        delta = np.sign(dnll_dlmb(power, probes, x, true_deriv))
+
+        # Known end of the bracket (0 in the first round) and the side of the
+        # probes that over- or underflow (NaN or exactly 0): beyond the last
+        # probe while growing, else the end farther from 0 as overflow grows
+        # with |lmb|
+        if lmb_neg > -np.inf and lmb_pos < np.inf:
+            ref = (lmb_neg + lmb_pos) / 2
+            side = np.full(k, 1 if abs(lmb_pos) >= abs(lmb_neg) else -1)
+        elif lmb_neg > -np.inf or lmb_pos < np.inf:
+            ref = lmb_neg if lmb_neg > -np.inf else lmb_pos
+            side = np.full(k, 1 if lmb_neg > -np.inf else -1)
+        else:
+            ref = 0
+            side = np.where(probes > 0, 1, -1)
+        overflow = ~(abs(delta) > 0)
+        delta[overflow] = side[overflow]
+
+        # The sign change (or an end of the probes) that agrees with most
+        # signs, rounding noise far from the minimum can add spurious ones.
+        # Ties go to the one nearest to the known end
+        edges = np.r_[lmb_neg, probes, lmb_pos]
+        agree = (
+            np.r_[0, np.cumsum(delta < 0)]
+            + np.r_[np.cumsum((delta > 0)[::-1])[::-1], 0]
+        )
+        split = np.flatnonzero(agree == np.max(agree))
+        dist = np.maximum(np.maximum(edges[split] - ref, ref - edges[split + 1]), 0)
+        j = split[np.argmin(dist)]
+        lmb_neg, lmb_pos = edges[j], edges[j + 1]
+
+        if lmb_neg > -np.inf and lmb_pos < np.inf:
+            lmb = (lmb_neg + lmb_pos) / 2
+        else:
+            lmb = probes[-1] if lmb_pos == np.inf else probes[0]
+
+        # similar to scipy.optimize.bisect
+        if abs((lmb_pos - lmb_neg) / 2) < xtol + rtol * abs(lmb):
+            break
+
+    if full_output:
+        return lmb, i + 1
+    return lmb
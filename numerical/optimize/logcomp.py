@@ -1,48 +1,64 @@
 import numpy as np
-from scipy.stats import yeojohnson_llf as sp_yeojohnson_llf
 from scipy.stats._morestats import _yeojohnson_transform
-from scipy.special import log1p, boxcox, logsumexp, lambertw
+from scipy.special import log1p, boxcox, lambertw
 from scipy.optimize import brent
-from .utils import _log_var
+from .prepared import BoxCoxData, YeoJohnsonData, BoxCoxColumns, YeoJohnsonColumns
+from .batch import batch_brent
+from .newton import newton_max
+from .stream import BoxCoxStream, YeoJohnsonStream
+
+
+def _prepare(x, data_cls, stream_cls, sample_weight=None):
+    # Wrap raw data in its prepared-data object
+    if isinstance(x, (data_cls, stream_cls)):
+        if sample_weight is not None:
+            raise ValueError(
+                "sample_weight cannot be given when x is already prepared, "
+                "pass weights when building the data object"
+            )
+        return x
 
+    return data_cls(x, sample_weight)
 
-def boxcox_llf(lmb, x, var_comp="log"):
-    # Log-likelihood function for Box-Cox
-    x = np.asarray(x, dtype=np.float64)
-    x = x[~np.isnan(x)]
 
-    if np.any(x <= 0):
-        raise ValueError("x must be strictly positive.")
+def boxcox_llf(lmb, x, var_comp="log", sample_weight=None):
+    # Log-likelihood function for Box-Cox
+    x = _prepare(x, BoxCoxData, BoxCoxStream, sample_weight)
 
-    n = x.shape[0]
-    logx = np.log(x)
+    return x.llf(lmb, var_comp)
 
-    # Compute the variance of the transformed data.
-    if abs(lmb) < np.spacing(1.0):
-        logvar = np.log(np.var(logx))
 
-    elif var_comp == "log":
-        logvar = _log_var(lmb * logx) - 2 * np.log(abs(lmb))
+def boxcox_mle(x, brack=(-2, 2), var_comp="log", optimize="brent", sample_weight=None):
+    # Maximum Likelihood Estimation of optimal lmbda for Box-Cox
+    def _neg_llf(lmb, data):
+        return -data.llf(lmb, var_comp)
 
-    elif var_comp == "linear":
-        # Same as SciPy <= 1.11
-        logvar = np.log(np.var(x**lmb / lmb))
+    x = _prepare(x, BoxCoxData, BoxCoxStream, sample_weight)
 
-    return (lmb - 1) * np.sum(logx) - n / 2 * logvar
+    if isinstance(x, BoxCoxStream) and not x.chunks.reusable:
+        raise ValueError("MLE needs several passes, x cannot be a single-use iterator")
+    if isinstance(x, BoxCoxStream) and optimize == "newton":
+        raise ValueError("newton requires prepared data with derivatives, not a stream")
 
+    if optimize == "brent":
+        return brent(_neg_llf, brack=brack, args=(x,))
+    elif optimize == "newton":
+        # Analytic derivatives, var_comp does not apply
+        return newton_max(x.dllf, brack=brack, func=x.llf)
+    else:
+        raise ValueError("optimize must be either 'brent' or 'newton'")
 
-def boxcox_mle(x, brack=(-2, 2), var_comp="log"):
-    # Maximum Likelihood Estimation of optimal lmbda for Box-Cox
-    def _neg_llf(lmb, x):
-        return -boxcox_llf(lmb, x, var_comp)
 
-    x = np.asarray(x, dtype=np.float64)
-    x = x[~np.isnan(x)]
+def boxcox_mle_batch(X, brack=(-2, 2)):
+    # Maximum Likelihood Estimation of optimal lmbda for each column of X
+    def _neg_llf(lmb, idx, data):
+        return -data.llf(lmb, idx)
 
-    if np.any(x <= 0):
-        raise ValueError("x must be strictly positive.")
+    if not isinstance(X, BoxCoxColumns):
+        X = BoxCoxColumns(X)
 
-    return brent(_neg_llf, brack=brack, args=(x,))
+    brack = [np.full(X.n_columns, b, dtype=np.float64) for b in brack]
+    return batch_brent(_neg_llf, brack=brack, args=(X,))
 
 
 def boxcox_inv_lmbda(x, y):
@@ -72,69 +88,46 @@ def boxcox_constranined_lmax(lmax, x, ymax):
     return lmax
 
 
-def yeojohnson_llf(lmb, x, var_comp="log"):
+def yeojohnson_llf(lmb, x, var_comp="log", sample_weight=None):
     # Log-likelihood function for Yeo-Johnson
-    x = np.asarray(x, dtype=np.float64)
-    x = x[~np.isnan(x)]
-
-    if var_comp == "log":
-        pos = x >= 0  # binary mask
-
-        if np.all(pos):
-            if abs(lmb) < np.spacing(1.0):
-                logvar = np.log(np.var(log1p(x)))
-            else:
-                logvar = _log_var(lmb * log1p(x)) - 2 * np.log(abs(lmb))
-
-        elif np.all(~pos):
-            if abs(lmb - 2) < np.spacing(1.0):
-                logvar = np.log(np.var(log1p(-x)))
-            else:
-                logvar = _log_var((2 - lmb) * log1p(-x)) - 2 * np.log(abs(2 - lmb))
-
-        else:  # mixed positive and negative data
-            logyj = np.zeros_like(x, dtype=np.complex128)
-
-            # x >= 0
-            if abs(lmb) < np.spacing(1.0):
-                with np.errstate(divide="ignore"):
-                    logyj[pos] = np.log(log1p(x[pos]) + 0j)
-            else:  # lmbda != 0
-                logm1_pos = np.full_like(x[pos], np.pi * 1j, dtype=np.complex128)
-                logyj[pos] = logsumexp(
-                    [lmb * log1p(x[pos]), logm1_pos], axis=0
-                ) - np.log(lmb + 0j)
-
-            # x < 0
-            if abs(lmb - 2) < np.spacing(1.0):
-                logyj[~pos] = np.log(-log1p(-x[~pos]) + 0j)
-            else:  # lmbda != 2
-                logm1_neg = np.full_like(x[~pos], np.pi * 1j, dtype=np.complex128)
-                logyj[~pos] = logsumexp(
-                    [(2 - lmb) * log1p(-x[~pos]), logm1_neg], axis=0
-                ) - np.log(lmb - 2 + 0j)
-
-            logvar = _log_var(logyj)
-
-        n = x.shape[0]
-        ll = (lmb - 1) * np.sum(np.sign(x) * log1p(np.abs(x)))
-        ll += -n / 2 * logvar
-
-    elif var_comp == "linear":
-        ll = sp_yeojohnson_llf(lmb, x)
-
-    return ll
-
-
-def yeojohnson_mle(x, brack=(-2, 2), var_comp="log"):
+    x = _prepare(x, YeoJohnsonData, YeoJohnsonStream, sample_weight)
+
+    return x.llf(lmb, var_comp)
+
+
+def yeojohnson_mle(
+    x, brack=(-2, 2), var_comp="log", optimize="brent", sample_weight=None
+):
     # Maximum Likelihood Estimation of optimal lmbda for Yeo-Johnson
-    def _neg_llf(lmb, x):
-        return -yeojohnson_llf(lmb, x, var_comp)
+    def _neg_llf(lmb, data):
+        return -data.llf(lmb, var_comp)
+
+    x = _prepare(x, YeoJohnsonData, YeoJohnsonStream, sample_weight)
+
+    if isinstance(x, YeoJohnsonStream) and not x.chunks.reusable:
+        raise ValueError("MLE needs several passes, x cannot be a single-use iterator")
+    if isinstance(x, YeoJohnsonStream) and optimize == "newton":
+        raise ValueError("newton requires prepared data with derivatives, not a stream")
+
+    if optimize == "brent":
+        return brent(_neg_llf, brack=brack, args=(x,))
+    elif optimize == "newton":
+        # Analytic derivatives, var_comp does not apply
+        return newton_max(x.dllf, brack=brack, func=x.llf)
+    else:
+        raise ValueError("optimize must be either 'brent' or 'newton'")
+
+
+def yeojohnson_mle_batch(X, brack=(-2, 2)):
+    # Maximum Likelihood Estimation of optimal lmbda for each column of X
+    def _neg_llf(lmb, idx, data):
+        return -data.llf(lmb, idx)
 
-    x = np.asarray(x, dtype=np.float64)
-    x = x[~np.isnan(x)]
+    if not isinstance(X, YeoJohnsonColumns):
+        X = YeoJohnsonColumns(X)
 
-    return brent(_neg_llf, brack=brack, args=(x,))
+    brack = [np.full(X.n_columns, b, dtype=np.float64) for b in brack]
+    return batch_brent(_neg_llf, brack=brack, args=(X,))
 
 
 def yeojohnson_inv_lmbda(x, y):
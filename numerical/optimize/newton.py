@@ -0,0 +1,59 @@
+import numpy as np
+from scipy.optimize import brent
+
+_mintol = 1.0e-11  # same as scipy.optimize.brent
+
+
+def newton_max(dfunc, brack=(-2, 2), args=(), tol=1.48e-8, maxiter=500, func=None):
+    # Maximize a 1D function with safeguarded Newton iterations,
+    # dfunc(x, *args) returns its first and second derivatives at x. Where
+    # they are unusable (d1 not finite, or d1 = 0 off a maximum, e.g. after
+    # underflow), the function func(x, *args) is maximized with Brent instead
+    x = (brack[0] + brack[1]) / 2
+    step = (brack[1] - brack[0]) / 2
+
+    # Bracket of the maximum: d1(lo) > 0 > d1(hi)
+    lo, hi = -np.inf, np.inf
+
+    for _ in range(maxiter):
+        d1, d2 = dfunc(x, *args)
+
+        if d1 == 0 and d2 < 0:
+            return x
+
+        if d1 == 0 or not np.isfinite(d1):
+            if func is None:
+                raise ValueError(
+                    f"derivative is not usable at x={x}, "
+                    "pass func to fall back to Brent"
+                )
+            if np.isfinite(lo) and np.isfinite(hi):
+                brack = (lo, hi)
+            return brent(lambda x, *args: -func(x, *args), brack=brack, args=args)
+
+        if d1 > 0:
+            lo = x
+        else:
+            hi = x
+
+        x_new = x - d1 / d2 if d2 < 0 else np.nan
+        if lo < x_new < hi:
+            # Newton steps towards an open end of the bracket are limited
+            open_end = hi if x_new > x else lo
+            newton = np.isfinite(open_end) or abs(x_new - x) <= step
+        else:
+            newton = False
+
+        if not newton:
+            if np.isfinite(lo) and np.isfinite(hi):
+                x_new = (lo + hi) / 2  # bisection
+            else:
+                x_new = x + step if d1 > 0 else x - step  # exponential expansion
+                step *= 2
+
+        if abs(x_new - x) < tol * abs(x_new) + _mintol:
+            return x_new
+
+        x = x_new
+
+    return x
@@ -0,0 +1,211 @@
+import numpy as np
+from scipy.interpolate import CubicSpline
+from scipy.special import log1p
+from .stream import _chunk_moments, _merge, _power_moments
+from .utils import _log_merge
+
+_MIN_STEP = 1e-6  # finest spacing of the lambda grid
+_MAX_MOVES = 50  # grid moves per batch
+
+
+def _match(grid, old_grid):
+    # Index of each grid point in old_grid, -1 where it is not there
+    j = np.clip(np.searchsorted(old_grid, grid), 1, len(old_grid) - 1)
+    j = np.where(grid - old_grid[j - 1] < old_grid[j] - grid, j - 1, j)
+    tol = 1e-9 * (old_grid[1] - old_grid[0])
+    return np.where(abs(grid - old_grid[j]) <= tol, j, -1)
+
+
+def _regrid(grid, old_grid, stats, fill):
+    # Statistics on old_grid moved to grid, fill(lmb) gives the missing ones
+    n, *moments = stats
+    idx = _match(grid, old_grid)
+    new = idx < 0
+    moments = [m[idx] for m in moments]
+    if np.any(new):
+        for m, m_new in zip(moments, fill(grid[new])[1:]):
+            m[new] = m_new
+    return (n, *moments)
+
+
+def _spline_max(grid, ll):
+    # Maximum of the cubic spline through (grid, ll) and its second derivative
+    spline = CubicSpline(grid, ll)
+    i = np.argmax(ll)
+    lo, hi = grid[max(i - 1, 0)], grid[min(i + 1, len(grid) - 1)]
+    roots = spline.derivative().roots(extrapolate=False)
+    lmb = np.r_[grid[i], roots[(roots >= lo) & (roots <= hi)]]
+    lmb = lmb[np.argmax(spline(lmb))]
+    return lmb, spline(lmb, 2)
+
+
+class _PowerOnline:
+    # Incremental MLE of lmb. For an odd number of lambdas on a uniform grid
+    # around the current optimum, it keeps the count, log|mean|, sign of mean
+    # and log M2 of each bucket of the transformed data (in the frame of
+    # stream._chunk_moments) and the constant term. A batch costs
+    # O(batch x grid): its statistics are merged into the running ones.
+    #
+    # When the optimum nears an edge of the grid, the grid is re-centred on
+    # it. When it is well inside and the spacing exceeds half a standard error
+    # of lmb, the grid is refined around it. Past batches are not revisited:
+    # on a new grid point their statistics come from cubic splines over the
+    # old grid of log M2 and of mean / sqrt(M2). Points the two grids share
+    # keep their exact statistics, so refining only interpolates.
+
+    def __init__(self, brack=(-2, 2), n_points=17):
+        lo, hi = brack
+        if not lo < hi:
+            raise ValueError("brack must be an interval (lo, hi) with lo < hi")
+        if n_points < 5 or n_points % 2 == 0:
+            raise ValueError("n_points must be an odd integer >= 5")
+
+        self._offsets = np.arange(n_points) - n_points // 2
+        self.step = (hi - lo) / (n_points - 1)
+        self.grid = (lo + hi) / 2 + self.step * self._offsets
+        self.lmb = (lo + hi) / 2
+        self.n = 0
+        self.c = 0.0
+        self._buckets = {}  # key: (l0, min, max, statistics on self.grid)
+
+    def _past_fill(self, key):
+        # Statistics of past batches at new lambdas
+        l0, l_min, l_max, (n, logmean, smean, logM2) = self._buckets[key]
+        if l_min == l_max:
+            # n copies of one value, exact at any lmb
+            def fill(lmb):
+                return (n, *_chunk_moments(self._lmb(key, lmb), np.r_[l_min], l0))
+
+            return fill
+
+        logM2_spline = CubicSpline(self.grid, logM2)
+        r_spline = CubicSpline(self.grid, smean * np.exp(logmean - logM2 / 2))
+
+        def fill(lmb):
+            logM2, r = logM2_spline(lmb), r_spline(lmb)
+            with np.errstate(divide="ignore"):
+                return n, np.log(abs(r)) + logM2 / 2, np.sign(r), logM2
+
+        return fill
+
+    def partial_fit(self, x):
+        x = np.asarray(x, dtype=np.float64).reshape(-1)
+        x = x[~np.isnan(x)]
+        if len(x) == 0:
+            return self
+
+        c_batch, parts = self._split(x)
+        c = self.c + c_batch
+
+        # Buckets after the batch, with the reference point of the first one
+        ranges, batch, batch_fill, past, past_fill = {}, {}, {}, {}, {}
+        for key, l in parts.items():
+            if len(l) == 0:
+                continue
+            l0, l_min, l_max, _ = self._buckets.get(key, (np.mean(l), l[0], l[0], 0))
+            ranges[key] = (l0, min(l_min, np.min(l)), max(l_max, np.max(l)))
+
+            def fill(lmb, key=key, l=l, l0=l0):
+                return (len(l), *_chunk_moments(self._lmb(key, lmb), l, l0))
+
+            batch[key], batch_fill[key] = fill(self.grid), fill
+
+        for key, bucket in self._buckets.items():
+            ranges.setdefault(key, bucket[:3])
+            past[key], past_fill[key] = bucket[3], self._past_fill(key)
+
+        grid, step, m = self.grid, self.step, len(self.grid) // 2
+        for n_moves in range(_MAX_MOVES + 1):
+            buckets = {}
+            for key, (l0, _, _) in ranges.items():
+                stats = past.get(key)
+                if key in batch:
+                    stats = _merge(stats, batch[key])
+                buckets[key] = (l0, stats)
+
+            ll = self._llf(grid, c, buckets)
+            if not np.all(np.isfinite(ll)):
+                # Constant data, llf is flat
+                lmb = grid[m]
+                break
+
+            lmb, d2 = _spline_max(grid, ll)
+            i = np.argmax(ll)
+            if n_moves == _MAX_MOVES:
+                break
+
+            if abs(i - m) > m / 2:
+                # Near an edge, re-centre on the optimum
+                pass
+            elif d2 < 0 and step / 2 >= max(_MIN_STEP, 0.5 / np.sqrt(-d2)):
+                # Well inside, refine while the spacing is over half an error
+                step /= 2
+            else:
+                break
+
+            # Past statistics always come from the grid they were merged on
+            new_grid = grid[i] + step * self._offsets
+            for key in batch:
+                batch[key] = _regrid(new_grid, grid, batch[key], batch_fill[key])
+            for key in past:
+                past[key] = _regrid(
+                    new_grid, self.grid, self._buckets[key][3], past_fill[key]
+                )
+            grid = new_grid
+
+        self._buckets = {
+            key: (*ranges[key], stats) for key, (_, stats) in buckets.items()
+        }
+        self.grid, self.step = grid, step
+        self.lmb, self.n, self.c = lmb, self.n + len(x), c
+        return self
+
+
+class BoxCoxOnline(_PowerOnline):
+    # Incremental Box-Cox MLE, self.lmb is the estimate on the data seen so far
+
+    def _split(self, x):
+        if np.any(x <= 0):
+            raise ValueError("x must be strictly positive.")
+        logx = np.log(x)
+        return np.sum(logx), {"pos": logx}
+
+    def _lmb(self, key, lmb):
+        return lmb
+
+    def _llf(self, lmb, c, buckets):
+        l0, (n, _, _, logM2) = buckets["pos"]
+        return (lmb - 1) * c - n / 2 * (logM2 + 2 * lmb * l0 - np.log(n))
+
+
+class YeoJohnsonOnline(_PowerOnline):
+    # Incremental Yeo-Johnson MLE, self.lmb is the estimate on the data seen
+    # so far. Positive and negative values are kept in separate buckets
+
+    def _split(self, x):
+        pos = x >= 0  # binary mask
+        l, m = log1p(x[pos]), log1p(-x[~pos])
+        return np.sum(l) - np.sum(m), {"pos": l, "neg": m}
+
+    def _lmb(self, key, lmb):
+        return lmb if key == "pos" else 2 - lmb
+
+    def _llf(self, lmb, c, buckets):
+        acc = {
+            key: _power_moments(self._lmb(key, lmb), l0, *stats)
+            for key, (l0, stats) in buckets.items()
+        }
+
+        if "neg" not in acc:  # all positive
+            n, _, _, logM2 = acc["pos"]
+
+        elif "pos" not in acc:  # all negative
+            n, _, _, logM2 = acc["neg"]
+
+        else:  # mixed positive and negative data, psi = -phi for x < 0
+            n_neg, logmean_neg, smean_neg, logM2_neg = acc["neg"]
+            n, _, _, logM2 = _log_merge(
+                *acc["pos"], n_neg, logmean_neg, -smean_neg, logM2_neg
+            )
+
+        return (lmb - 1) * c - n / 2 * (logM2 - np.log(n))
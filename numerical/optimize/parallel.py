@@ -0,0 +1,82 @@
+# Fit the columns of a wide matrix in several processes. The matrix is
+# copied once, column by column, into shared memory and every worker fits
+# a range of columns from a view of it, so no data is pickled. Each column
+# is fitted independently by the batched optimizer, the lambdas are thus
+# the same for any number of workers.
+
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from .logcomp import boxcox_mle_batch, yeojohnson_mle_batch
+
+# Number of column ranges per worker, smaller ranges balance the load
+_RANGES_PER_JOB = 4
+
+_shared = {}  # shared matrix attached in each worker
+
+
+def _effective_n_jobs(n_jobs):
+    # Same convention as joblib: None is 1, negative counts from cpu_count
+    if n_jobs is None:
+        return 1
+    if n_jobs == 0:
+        raise ValueError("n_jobs must not be 0")
+    if n_jobs < 0:
+        return max(1, os.cpu_count() + 1 + n_jobs)
+    return n_jobs
+
+
+def _attach(name, shape):
+    # Worker initializer: view the transposed matrix in shared memory
+    shm = shared_memory.SharedMemory(name=name)
+    _shared["shm"] = shm
+    _shared["Xt"] = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+
+
+def _fit_range(mle_batch, start, stop, brack):
+    # Xt[start:stop].T is a (n_samples, k) view with contiguous columns
+    return mle_batch(_shared["Xt"][start:stop].T, brack=brack)
+
+
+def _mle_parallel(mle_batch, X, brack, n_jobs):
+    X = np.asarray(X, dtype=np.float64)
+    if X.ndim != 2:
+        raise ValueError("X must be a 2D array of shape (n_samples, n_features)")
+
+    n_jobs = min(_effective_n_jobs(n_jobs), X.shape[1])
+    if n_jobs <= 1:
+        return mle_batch(X, brack=brack)
+
+    shm = shared_memory.SharedMemory(create=True, size=max(1, X.nbytes))
+    try:
+        Xt = np.ndarray(X.shape[::-1], dtype=np.float64, buffer=shm.buf)
+        Xt[:] = X.T
+        del Xt  # the buffer cannot be released while viewed
+
+        bounds = np.linspace(0, X.shape[1], n_jobs * _RANGES_PER_JOB + 1)
+        bounds = np.unique(bounds.astype(np.intp))
+
+        with ProcessPoolExecutor(
+            n_jobs, initializer=_attach, initargs=(shm.name, X.shape[::-1])
+        ) as pool:
+            futures = [
+                pool.submit(_fit_range, mle_batch, start, stop, brack)
+                for start, stop in zip(bounds[:-1], bounds[1:])
+            ]
+            return np.concatenate([f.result() for f in futures])
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def boxcox_mle_parallel(X, brack=(-2, 2), n_jobs=None):
+    # Maximum Likelihood Estimation of optimal lmbda for each column of X,
+    # column ranges are fitted in n_jobs processes
+    return _mle_parallel(boxcox_mle_batch, X, brack, n_jobs)
+
+
+def yeojohnson_mle_parallel(X, brack=(-2, 2), n_jobs=None):
+    # Maximum Likelihood Estimation of optimal lmbda for each column of X,
+    # column ranges are fitted in n_jobs processes
+    return _mle_parallel(yeojohnson_mle_batch, X, brack, n_jobs)
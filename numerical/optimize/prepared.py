@@ -0,0 +1,615 @@
+import math
+import numpy as np
+import scipy.sparse as sp_sparse
+from scipy.stats import yeojohnson_llf as sp_yeojohnson_llf
+from scipy.stats._morestats import _yeojohnson_transform
+from scipy.special import log1p
+from .utils import (
+    _add_logw,
+    _log_add,
+    _log_dev_max,
+    _log_expm1,
+    _logsumexp,
+    _log_var_split,
+    _gen_lmb_slices,
+)
+
+# Below _TAU_SMALL, h-functions are evaluated by series with _N_SERIES terms
+_TAU_SMALL = 0.05
+_N_SERIES = 10
+
+# x is collapsed to distinct values with counts when a sample of _COMPRESS_SAMPLE
+# values has at most _COMPRESS_RATIO of them distinct
+_COMPRESS_SAMPLE = 4096
+_COMPRESS_RATIO = 0.25
+
+
+def _power_logvar(lmb, logx, logx_min, logx_max, n, valid=None, logw=None, n_zero=0):
+    # Log variance of (exp(lmb * logx) - 1) / lmb for a 1D array of lmb,
+    # logx is either shared by all lmb or has one row per lmb.
+    # With log-weights logw, n is the total weight. n_zero more entries
+    # (or weight) with logx = 0 are added as one block, n includes them
+    eq_0 = abs(lmb) < np.spacing(1.0)
+    lmb_col = np.where(eq_0, 1.0, lmb)[:, None]
+    logx_min = np.reshape(logx_min, (-1, 1))
+    logx_max = np.reshape(logx_max, (-1, 1))
+    n = np.reshape(n, (-1, 1))
+
+    # The extremes of lmb * logx are known from the extremes of logx,
+    # so the max-shift of each logsumexp needs no extra pass over the data
+    lx = lmb_col * logx
+    lx_max = np.maximum(lmb_col * logx_min, lmb_col * logx_max)
+    lx_min = np.minimum(lmb_col * logx_min, lmb_col * logx_max)
+
+    if valid is not None:  # skip NaNs
+        lx = np.where(valid, lx, -np.inf)
+
+    logw_max = 0.0 if logw is None else np.max(logw)
+    logmean = _logsumexp(_add_logw(lx, logw), lx_max + logw_max, keepdims=True)
+    if n_zero > 0:  # exp(lmb * 0) = 1
+        logmean = np.logaddexp(logmean, np.log(n_zero))
+    logmean -= np.log(n)
+    logxmu = _log_add(lx, logmean, sb=-1, return_sign=False)
+
+    if valid is not None:
+        logxmu = np.where(valid, logxmu, -np.inf)
+
+    logxmu_max = _log_dev_max(lx_max, lx_min, logmean)
+    logM2 = _logsumexp(_add_logw(2 * logxmu, logw), 2 * logxmu_max + logw_max)
+    if n_zero > 0:
+        logM2 = np.logaddexp(
+            logM2,
+            np.log(n_zero) + 2 * _log_add(0.0, logmean[:, 0], sb=-1, return_sign=False),
+        )
+
+    logvar = logM2 - np.log(n[:, 0]) - 2 * np.log(abs(lmb_col[:, 0]))
+
+    if np.any(eq_0):
+        logx_0 = logx[eq_0] if logx.ndim > 1 else logx
+        if logw is not None or n_zero > 0:
+            w = None if logw is None else np.exp(logw)
+            var_0 = _weighted_var(logx_0, w, n_zero=n_zero)
+        elif valid is not None:
+            var_0 = np.nanvar(logx_0, axis=-1)
+        else:
+            var_0 = np.var(logx_0, axis=-1)
+        logvar[eq_0] = np.log(var_0)
+
+    return logvar
+
+
+def _weighted_var(x, w, axis=-1, n_zero=0):
+    # Variance of x with weights w and n_zero more zeros
+    if n_zero == 0:
+        mean = np.average(x, axis=axis, weights=w)
+        return np.average((x - np.expand_dims(mean, axis)) ** 2, axis=axis, weights=w)
+
+    sw = x.shape[axis] if w is None else np.sum(w)
+    n = sw + n_zero
+    mean = np.average(x, axis=axis, weights=w) * sw / n
+    M2 = np.average((x - np.expand_dims(mean, axis)) ** 2, axis=axis, weights=w) * sw
+    return (M2 + n_zero * mean**2) / n
+
+
+def _power_logabs(lmb, logx):
+    # log|(exp(lmb * logx) - 1) / lmb| elementwise, logx >= 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        logpsi = _log_expm1(lmb * logx) - np.log(abs(lmb))
+
+        eq_0 = abs(lmb) < np.spacing(1.0)
+        if np.any(eq_0):
+            logpsi = np.where(eq_0, np.log(logx), logpsi)
+
+    return logpsi
+
+
+def _h_small(tau, e, scale):
+    # h2 by its series sum_j tau^j / (j! (j + 3)), then h1 and h0 by the
+    # recurrences h1 = (e^tau - tau h2) / 2 and h0 = e^tau - tau h1,
+    # which are stable for small tau. e is scale * e^tau
+    h2 = np.full_like(tau, 1 / (_N_SERIES + 2) / math.factorial(_N_SERIES - 1))
+    for j in range(_N_SERIES - 2, -1, -1):
+        h2 = h2 * tau + 1 / (j + 3) / math.factorial(j)
+
+    h2 *= scale
+    h1 = (e - tau * h2) / 2
+    h0 = e - tau * h1
+    return h0, h1, h2
+
+
+def _h_scaled(tau, M):
+    # e^-M times h0(tau) = expm1(tau) / tau and its derivatives h1, h2,
+    # M is a scalar or broadcasts against tau
+    e, scale = np.exp(tau - M), np.exp(-M)
+    small = abs(tau) < _TAU_SMALL
+
+    if np.all(small):
+        return _h_small(tau, e, scale)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        h0 = (e - scale) / tau
+        h1 = (e - h0) / tau
+        h2 = (e - 2 * h1) / tau
+
+    if np.any(small):
+        if np.ndim(scale) > 0:
+            scale = np.broadcast_to(scale, tau.shape)[small]
+        h0[small], h1[small], h2[small] = _h_small(tau[small], e[small], scale)
+
+    return h0, h1, h2
+
+
+def _power_dmoments(g, dg, d2g, w=None):
+    # Centered (weighted) sums S_gg, S_gg' and S_g'g' + S_gg'' of the
+    # transformed data g and its first two derivatives dg, d2g with respect to lmb
+    g = g - np.average(g, weights=w)
+    dg = dg - np.average(dg, weights=w)
+    wg, wdg = (g, dg) if w is None else (w * g, w * dg)
+    return np.dot(wg, g), np.dot(wg, dg), np.dot(wdg, dg) + np.dot(wg, d2g)
+
+
+def _power_dllf(lmb, logx, logx_min, logx_max, c, n, w=None):
+    # First and second derivatives of (lmb - 1) * c - n / 2 * log(var(psi)),
+    # psi = (exp(lmb * logx) - 1) / lmb. Shifting logx to delta = logx - l0 only
+    # adds a constant and a common factor exp(lmb * l0) to psi, so the
+    # derivatives are computed from delta * h(lmb * delta) scaled by e^-M
+    l0 = (logx_min + logx_max) / 2
+    delta = logx - l0
+    M = abs(lmb) * (logx_max - logx_min) / 2  # max of lmb * delta
+
+    h0, h1, h2 = _h_scaled(lmb * delta, M)
+    S_gg, S_gdg, S_2 = _power_dmoments(delta * h0, delta**2 * h1, delta**3 * h2, w)
+
+    r = S_gdg / S_gg
+    return c - n * l0 - n * r, -n * S_2 / S_gg + 2 * n * r**2
+
+
+def _check_data(x, sample_weight=None, compress="auto"):
+    # Drop NaNs and zero weights, and collapse x to its distinct values
+    # with counts (or summed weights) when it has few of them
+    x = np.asarray(x, dtype=np.float64)
+    keep = ~np.isnan(x)
+
+    if sample_weight is not None:
+        w = np.asarray(sample_weight, dtype=np.float64)
+        if w.shape != x.shape:
+            raise ValueError("sample_weight must have the same shape as x")
+        if np.any(w < 0):
+            raise ValueError("sample_weight must be non-negative")
+        keep &= w > 0
+        w = w[keep]
+
+    x = x[keep]
+
+    if compress == "auto":
+        # Guess the cardinality from a strided sample
+        sample = x[:: max(1, len(x) // _COMPRESS_SAMPLE)]
+        compress = len(np.unique(sample)) <= len(sample) * _COMPRESS_RATIO
+
+    if compress:
+        if sample_weight is None:
+            x, w = np.unique(x, return_counts=True)
+            w = w.astype(np.float64)
+        else:
+            x, inverse = np.unique(x, return_inverse=True)
+            w = np.bincount(inverse, weights=w)
+
+    elif sample_weight is None:
+        w = None
+
+    return x, w
+
+
+def _split_zeros(x, sample_weight=None):
+    # Split x (dense or scipy.sparse) into its nonzero values, their weights
+    # and the number (or total weight) of exact zeros, which is all that
+    # Yeo-Johnson needs to know about them
+    if sp_sparse.issparse(x):
+        coo = sp_sparse.coo_array(x)
+        if sample_weight is None:
+            n_zero = math.prod(coo.shape) - coo.nnz
+            x, w = coo.data, None
+        else:
+            w = np.asarray(sample_weight, dtype=np.float64)
+            if w.size != math.prod(coo.shape):
+                raise ValueError("sample_weight must have the same shape as x")
+            w = w.reshape(-1)
+            w_nz = w[np.ravel_multi_index(coo.coords, coo.shape)]
+            n_zero = np.sum(w) - np.sum(w_nz)
+            x, w = coo.data, w_nz
+    else:
+        x, w, n_zero = np.asarray(x), sample_weight, 0
+
+    zero = x == 0
+    if np.any(zero):
+        if w is None:
+            n_zero += np.count_nonzero(zero)
+        else:
+            w = np.asarray(w, dtype=np.float64)
+            if w.shape != x.shape:
+                raise ValueError("sample_weight must have the same shape as x")
+            n_zero += np.sum(w[zero])
+            w = w[~zero]
+        x = x[~zero]
+
+    return x, w, n_zero
+
+
+def _check_lmb(lmb):
+    lmb_arr = np.atleast_1d(lmb).astype(np.float64)
+    if lmb_arr.ndim > 1:
+        raise ValueError("lmb must be a scalar or 1D array")
+    return lmb_arr
+
+
+class BoxCoxData:
+    # Per-dataset invariants of Box-Cox, reused across lambdas
+
+    def __init__(self, x, sample_weight=None, compress="auto"):
+        # x may be scipy.sparse, any zero (implicit or not) is invalid
+        x, w, n_zero = _split_zeros(x, sample_weight)
+        x, w = _check_data(x, w, compress)
+
+        if n_zero > 0 or np.any(x <= 0):
+            raise ValueError("x must be strictly positive.")
+
+        # With weights (or counts), n is the total weight
+        self.x = x
+        self.w = w
+        self.logw = None if w is None else np.log(w)
+        self.n = x.shape[0] if w is None else np.sum(w)
+        self.logx = np.log(x)
+        self.logx_min = np.min(self.logx, initial=np.inf)
+        self.logx_max = np.max(self.logx, initial=-np.inf)
+        self.c = np.dot(self.logx, w) if w is not None else np.sum(self.logx)
+
+    def logvar(self, lmb, var_comp="log"):
+        # Log variance of the transformed data, chunked over lambdas
+        logvar = np.empty_like(lmb)
+
+        for s in _gen_lmb_slices(len(lmb), len(self.x)):
+            if var_comp == "log":
+                logvar[s] = _power_logvar(
+                    lmb[s],
+                    self.logx,
+                    self.logx_min,
+                    self.logx_max,
+                    self.n,
+                    logw=self.logw,
+                )
+
+            elif var_comp == "linear":
+                # Same as SciPy <= 1.11
+                lmb_s = lmb[s]
+                eq_0 = abs(lmb_s) < np.spacing(1.0)
+                logvar_s = np.empty_like(lmb_s)
+
+                if np.any(eq_0):
+                    logvar_s[eq_0] = np.log(_weighted_var(self.logx, self.w))
+
+                if not np.all(eq_0):
+                    lmb_ne0 = lmb_s[~eq_0, None]
+                    logvar_s[~eq_0] = np.log(
+                        _weighted_var(self.x**lmb_ne0 / lmb_ne0, self.w)
+                    )
+
+                logvar[s] = logvar_s
+
+        return logvar
+
+    def llf(self, lmb, var_comp="log"):
+        lmb_arr = _check_lmb(lmb)
+
+        ll = (lmb_arr - 1) * self.c - self.n / 2 * self.logvar(lmb_arr, var_comp)
+
+        if np.isscalar(lmb):
+            ll = ll[0]
+
+        return ll
+
+    def dllf(self, lmb):
+        # First and second derivatives of llf at a scalar lmb
+        return _power_dllf(
+            lmb, self.logx, self.logx_min, self.logx_max, self.c, self.n, self.w
+        )
+
+
+class YeoJohnsonData:
+    # Per-dataset invariants of Yeo-Johnson, reused across lambdas
+
+    def __init__(self, x, sample_weight=None, compress="auto"):
+        # Exact zeros are only counted, so sparse data costs O(nnz)
+        x, w, self.n_zero = _split_zeros(x, sample_weight)
+        x, w = _check_data(x, w, compress)
+
+        # With weights (or counts), n is the total weight
+        self.x = x
+        self.w = w
+        self.n = (x.shape[0] if w is None else np.sum(w)) + self.n_zero
+
+        # Contiguous positive and negative segments of the nonzero values
+        pos = x > 0  # binary mask
+        self.log1p_pos = log1p(x[pos])
+        self.log1p_neg = log1p(-x[~pos])
+        self.w_pos = None if w is None else w[pos]
+        self.w_neg = None if w is None else w[~pos]
+        self.logw_pos = None if w is None else np.log(self.w_pos)
+        self.logw_neg = None if w is None else np.log(self.w_neg)
+        self.n_pos = self.log1p_pos.shape[0]
+        self.n_neg = self.log1p_neg.shape[0]
+        self.log1p_pos_min = np.min(self.log1p_pos, initial=np.inf)
+        self.log1p_pos_max = np.max(self.log1p_pos, initial=-np.inf)
+        self.log1p_neg_min = np.min(self.log1p_neg, initial=np.inf)
+        self.log1p_neg_max = np.max(self.log1p_neg, initial=-np.inf)
+
+        if w is None:
+            self.c = np.sum(self.log1p_pos) - np.sum(self.log1p_neg)
+        else:
+            self.c = np.dot(self.log1p_pos, self.w_pos) - np.dot(
+                self.log1p_neg, self.w_neg
+            )
+
+    def logvar(self, lmb):
+        # Log variance of the transformed data, chunked over lambdas
+        logvar = np.empty_like(lmb)
+
+        for s in _gen_lmb_slices(len(lmb), len(self.x)):
+            if self.n_pos == 0 and self.n_neg == 0:  # all zeros
+                logvar[s] = -np.inf
+
+            elif self.n_neg == 0:  # all non-negative
+                logvar[s] = _power_logvar(
+                    lmb[s],
+                    self.log1p_pos,
+                    self.log1p_pos_min,
+                    self.log1p_pos_max,
+                    self.n,
+                    logw=self.logw_pos,
+                    n_zero=self.n_zero,
+                )
+
+            elif self.n_pos == 0:  # all non-positive
+                logvar[s] = _power_logvar(
+                    2 - lmb[s],
+                    self.log1p_neg,
+                    self.log1p_neg_min,
+                    self.log1p_neg_max,
+                    self.n,
+                    logw=self.logw_neg,
+                    n_zero=self.n_zero,
+                )
+
+            else:  # mixed positive and negative data
+                # log|yeojohnson(x)| is increasing in |x|
+                lmb_col = lmb[s, None]
+                logvar[s] = _log_var_split(
+                    _power_logabs(lmb_col, self.log1p_pos),
+                    _power_logabs(2 - lmb_col, self.log1p_neg),
+                    _power_logabs(lmb_col, self.log1p_pos_max),
+                    _power_logabs(2 - lmb_col, self.log1p_neg_max),
+                    self.n,
+                    self.logw_pos,
+                    self.logw_neg,
+                    self.n_zero,
+                )
+
+        return logvar
+
+    def llf(self, lmb, var_comp="log"):
+        lmb_arr = _check_lmb(lmb)
+
+        if var_comp == "log":
+            ll = (lmb_arr - 1) * self.c - self.n / 2 * self.logvar(lmb_arr)
+
+        elif var_comp == "linear":
+            if self.w is None and self.n_zero == 0:
+                ll = np.array([sp_yeojohnson_llf(l, self.x) for l in lmb_arr])
+            else:
+                ll = np.array(
+                    [
+                        (l - 1) * self.c
+                        - self.n
+                        / 2
+                        * np.log(
+                            _weighted_var(
+                                _yeojohnson_transform(self.x, l),
+                                self.w,
+                                n_zero=self.n_zero,
+                            )
+                        )
+                        for l in lmb_arr
+                    ]
+                )
+
+        if np.isscalar(lmb):
+            ll = ll[0]
+
+        return ll
+
+    def _with_zeros(self, logx, logx_min, w):
+        # Append the zeros (log1p(0) = 0) as one entry weighted by their count
+        if self.n_zero == 0:
+            return logx, logx_min, w
+        w = np.ones_like(logx) if w is None else w
+        return np.append(logx, 0.0), 0.0, np.append(w, self.n_zero)
+
+    def dllf(self, lmb):
+        # First and second derivatives of llf at a scalar lmb
+        if self.n_neg == 0:  # all non-negative
+            l, l_min, w = self._with_zeros(
+                self.log1p_pos, self.log1p_pos_min, self.w_pos
+            )
+            return _power_dllf(lmb, l, l_min, self.log1p_pos_max, self.c, self.n, w)
+
+        if (
+            self.n_pos == 0
+        ):  # all non-positive, lmb -> 2 - lmb flips the first derivative
+            m, m_min, w = self._with_zeros(
+                self.log1p_neg, self.log1p_neg_min, self.w_neg
+            )
+            d1, d2 = _power_dllf(
+                2 - lmb, m, m_min, self.log1p_neg_max, -self.c, self.n, w
+            )
+            return -d1, d2
+
+        # Mixed positive and negative data, psi changes sign so no shift is needed,
+        # only a common scale e^-M for both segments. The zeros have psi = 0
+        M = max(0.0, lmb * self.log1p_pos_max, (2 - lmb) * self.log1p_neg_max)
+        l, m = self.log1p_pos, self.log1p_neg
+        h0_pos, h1_pos, h2_pos = _h_scaled(lmb * l, M)
+        h0_neg, h1_neg, h2_neg = _h_scaled((2 - lmb) * m, M)
+
+        w = None if self.w is None else np.concatenate([self.w_pos, self.w_neg])
+        zero = np.zeros(1 if self.n_zero > 0 else 0)
+        if self.n_zero > 0:
+            w = np.append(np.ones(len(self.x)) if w is None else w, self.n_zero)
+
+        S_gg, S_gdg, S_2 = _power_dmoments(
+            np.concatenate([l * h0_pos, -m * h0_neg, zero]),
+            np.concatenate([l**2 * h1_pos, m**2 * h1_neg, zero]),
+            np.concatenate([l**3 * h2_pos, -(m**3) * h2_neg, zero]),
+            w,
+        )
+
+        r = S_gdg / S_gg
+        return self.c - self.n * r, -self.n * S_2 / S_gg + 2 * self.n * r**2
+
+
+def _check_columns(X):
+    X = np.asarray(X, dtype=np.float64)
+    if X.ndim != 2:
+        raise ValueError("X must be a 2D array of shape (n_samples, n_features)")
+
+    # One contiguous row per column
+    Xt = np.ascontiguousarray(X.T)
+    valid = ~np.isnan(Xt)
+    return Xt, (None if np.all(valid) else valid), np.sum(valid, axis=1)
+
+
+def _check_column_lmb(lmb, idx, n_columns):
+    idx = np.arange(n_columns) if idx is None else np.asarray(idx)
+    lmb_arr = np.broadcast_to(np.asarray(lmb, dtype=np.float64), idx.shape)
+    if lmb_arr.ndim != 1:
+        raise ValueError("lmb must be a scalar or 1D array with one lmb per column")
+    return lmb_arr, idx
+
+
+class BoxCoxColumns:
+    # Per-column invariants of Box-Cox for a (n_samples, n_features) matrix,
+    # each column is evaluated at its own lambda
+
+    def __init__(self, X):
+        Xt, self.valid, self.n = _check_columns(X)
+
+        if np.any(Xt <= 0):
+            raise ValueError("X must be strictly positive.")
+
+        self.n_columns = Xt.shape[0]
+        self.logx = np.log(Xt)
+        self.logx_min = np.min(self.logx, axis=1, initial=np.inf, where=self._where)
+        self.logx_max = np.max(self.logx, axis=1, initial=-np.inf, where=self._where)
+        self.c = np.sum(self.logx, axis=1, where=self._where)
+
+    @property
+    def _where(self):
+        return True if self.valid is None else self.valid
+
+    def logvar(self, lmb, idx):
+        # Log variance of the transformed columns idx, chunked over columns
+        logvar = np.empty_like(lmb)
+
+        for s in _gen_lmb_slices(len(lmb), self.logx.shape[1]):
+            i = idx[s]
+            logvar[s] = _power_logvar(
+                lmb[s],
+                self.logx[i],
+                self.logx_min[i],
+                self.logx_max[i],
+                self.n[i],
+                None if self.valid is None else self.valid[i],
+            )
+
+        return logvar
+
+    def llf(self, lmb, idx=None):
+        lmb_arr, idx = _check_column_lmb(lmb, idx, self.n_columns)
+        return (lmb_arr - 1) * self.c[idx] - self.n[idx] / 2 * self.logvar(lmb_arr, idx)
+
+
+class YeoJohnsonColumns:
+    # Per-column invariants of Yeo-Johnson for a (n_samples, n_features) matrix,
+    # each column is evaluated at its own lambda
+
+    def __init__(self, X):
+        Xt, self.valid, self.n = _check_columns(X)
+        where = True if self.valid is None else self.valid
+
+        self.n_columns = Xt.shape[0]
+        self.pos = Xt >= 0  # binary mask
+        self.sign = np.where(self.pos, 1.0, -1.0)
+        self.log1p_abs = log1p(abs(Xt))
+
+        pos, neg = self.pos & where, ~self.pos & where
+        self.has_pos = np.any(pos, axis=1)
+        self.has_neg = np.any(neg, axis=1)
+        self.log1p_pos_min = np.min(self.log1p_abs, axis=1, initial=np.inf, where=pos)
+        self.log1p_pos_max = np.max(self.log1p_abs, axis=1, initial=-np.inf, where=pos)
+        self.log1p_neg_min = np.min(self.log1p_abs, axis=1, initial=np.inf, where=neg)
+        self.log1p_neg_max = np.max(self.log1p_abs, axis=1, initial=-np.inf, where=neg)
+
+        self.c = np.sum(self.sign * self.log1p_abs, axis=1, where=where)
+
+    def _logvar(self, lmb, i):
+        # Log variance of the transformed rows i at lambdas lmb
+        logvar = np.empty_like(lmb)
+        valid = None if self.valid is None else self.valid[i]
+        mixed = self.has_pos[i] & self.has_neg[i]
+
+        # Single-signed rows are a plain power transform of log1p|x|
+        single = ~mixed
+        if np.any(single):
+            j, has_pos = i[single], self.has_pos[i[single]]
+            logvar[single] = _power_logvar(
+                np.where(has_pos, lmb[single], 2 - lmb[single]),
+                self.log1p_abs[j],
+                np.where(has_pos, self.log1p_pos_min[j], self.log1p_neg_min[j]),
+                np.where(has_pos, self.log1p_pos_max[j], self.log1p_neg_max[j]),
+                self.n[j],
+                None if valid is None else valid[single],
+            )
+
+        if np.any(mixed):
+            # Rows split into their positive and negative parts by zero weights
+            j, lmb_col = i[mixed], lmb[mixed, None]
+            pos = self.pos[j] if valid is None else self.pos[j] & valid[mixed]
+            neg = ~self.pos[j] if valid is None else ~self.pos[j] & valid[mixed]
+            logpsi = _power_logabs(
+                np.where(self.pos[j], lmb_col, 2 - lmb_col), self.log1p_abs[j]
+            )
+
+            # log|yeojohnson(x)| is increasing in |x|
+            with np.errstate(divide="ignore"):
+                logvar[mixed] = _log_var_split(
+                    np.where(pos, logpsi, -np.inf),
+                    np.where(neg, logpsi, -np.inf),
+                    _power_logabs(lmb_col, self.log1p_pos_max[j, None]),
+                    _power_logabs(2 - lmb_col, self.log1p_neg_max[j, None]),
+                    self.n[j],
+                    np.log(pos),
+                    np.log(neg),
+                )
+
+        return logvar
+
+    def logvar(self, lmb, idx):
+        # Log variance of the transformed columns idx, chunked over columns
+        logvar = np.empty_like(lmb)
+
+        for s in _gen_lmb_slices(len(lmb), self.log1p_abs.shape[1]):
+            logvar[s] = self._logvar(lmb[s], idx[s])
+
+        return logvar
+
+    def llf(self, lmb, idx=None):
+        lmb_arr, idx = _check_column_lmb(lmb, idx, self.n_columns)
+        return (lmb_arr - 1) * self.c[idx] - self.n[idx] / 2 * self.logvar(lmb_arr, idx)
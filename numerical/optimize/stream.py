@@ -0,0 +1,224 @@
+import os
+import numpy as np
+from scipy.special import log1p
+from .prepared import _power_logabs, _check_lmb
+from .utils import (
+    _log_add,
+    _log_dev_max,
+    _log_expm1,
+    _logsumexp,
+    _log_merge,
+    _gen_lmb_slices,
+    _CHUNK_SIZE,
+)
+
+
+class _Chunks:
+    # 1D float64 chunks without NaNs from an array (np.memmap included),
+    # a .npy path, a callable returning an iterable, or an iterable of chunks
+
+    def __init__(self, source, chunk_size=_CHUNK_SIZE):
+        if isinstance(source, (str, os.PathLike)):
+            source = np.load(source, mmap_mode="r")
+
+        self.source = source
+        self.chunk_size = chunk_size
+        self.reusable = (
+            isinstance(source, np.ndarray)
+            or callable(source)
+            or iter(source) is not source
+        )
+        self.consumed = False
+
+    def __iter__(self):
+        if not self.reusable:
+            if self.consumed:
+                raise ValueError(
+                    "a single-use iterator can be read only once, "
+                    "pass an array, a .npy path or a callable instead"
+                )
+            self.consumed = True
+
+        if isinstance(self.source, np.ndarray):
+            x = self.source.reshape(-1)
+            chunks = (
+                x[i : i + self.chunk_size] for i in range(0, len(x), self.chunk_size)
+            )
+        elif callable(self.source):
+            chunks = self.source()
+        else:
+            chunks = self.source
+
+        for chunk in chunks:
+            chunk = np.asarray(chunk, dtype=np.float64).reshape(-1)
+            chunk = chunk[~np.isnan(chunk)]
+            if len(chunk) > 0:
+                yield chunk
+
+
+def _log_v(lmb_col, delta):
+    # log|expm1(lmb * delta) / lmb| with lmb as a column
+    with np.errstate(divide="ignore", invalid="ignore"):
+        logv = _log_expm1(lmb_col * delta) - np.log(abs(lmb_col))
+
+        eq_0 = abs(lmb_col[:, 0]) < np.spacing(1.0)
+        if np.any(eq_0):
+            logv[eq_0] = np.log(abs(delta))
+
+    return logv
+
+
+def _chunk_moments(lmb, logx, l0):
+    # log|mean|, sign of mean and log M2 of v = expm1(lmb * (logx - l0)) / lmb for
+    # a 1D array of lmb. It equals (exp(lmb * logx) - 1) / lmb up to the factor
+    # exp(lmb * l0) and a constant, and stays accurate near lmb = 0
+    n_lmb, n = len(lmb), len(logx)
+    logmean, smean, logM2 = np.empty(n_lmb), np.empty(n_lmb), np.empty(n_lmb)
+    delta = logx - l0
+    sign = np.sign(delta)
+
+    # v is increasing in delta, so its extremes are at the extremes of delta
+    delta_ext = np.array([np.min(delta), np.max(delta)])
+    sign_ext = np.sign(delta_ext)
+
+    for s in _gen_lmb_slices(n_lmb, n):
+        lmb_col = lmb[s, None]
+        logv = _log_v(lmb_col, delta)
+        logv_ext = _log_v(lmb_col, delta_ext)
+
+        logsum, smean_s = _logsumexp(
+            logv, np.max(logv_ext, axis=1, keepdims=True), keepdims=True, b=sign
+        )
+        logmean_s = logsum - np.log(n)
+        logxmu = _log_add(logv, logmean_s, sign, -smean_s, return_sign=False)
+        logxmu_max = _log_dev_max(
+            logv_ext[:, :1], logv_ext[:, 1:], logmean_s, *sign_ext, smean_s
+        )
+
+        logmean[s], smean[s] = logmean_s[:, 0], smean_s[:, 0]
+        logM2[s] = _logsumexp(2 * logxmu, 2 * logxmu_max)
+
+    return logmean, smean, logM2
+
+
+def _merge(acc, stats):
+    # Merge the statistics of a new chunk into the running ones
+    if acc is None:
+        return stats
+    return _log_merge(*acc, *stats)
+
+
+def _power_moments(lmb, l0, n, logmean, smean, logM2):
+    # Moments of (exp(lmb * logx) - 1) / lmb from those of
+    # expm1(lmb * (logx - l0)) / lmb, logx >= 0
+    logmean, smean = _log_add(lmb * l0 + logmean, _power_logabs(lmb, l0), smean, 1)
+    return n, logmean, smean, logM2 + 2 * lmb * l0
+
+
+class BoxCoxStream:
+    # Box-Cox statistics computed chunk by chunk, memory is O(chunk_size)
+
+    def __init__(self, source, chunk_size=_CHUNK_SIZE):
+        self.chunks = _Chunks(source, chunk_size)
+
+    def _stats(self, lmb):
+        # One pass over the data: constant term, n and log M2 of
+        # exp(lmb * logx) / lmb
+        c, l0, acc = 0.0, None, None
+
+        for x in self.chunks:
+            if np.any(x <= 0):
+                raise ValueError("x must be strictly positive.")
+
+            logx = np.log(x)
+            c += np.sum(logx)
+
+            # Reference point of this pass
+            l0 = np.mean(logx) if l0 is None else l0
+            acc = _merge(acc, (len(x), *_chunk_moments(lmb, logx, l0)))
+
+        if acc is None:
+            raise ValueError("x must contain at least one non-NaN value.")
+
+        return c, acc[0], acc[3] + 2 * lmb * l0
+
+    def llf(self, lmb, var_comp="log"):
+        if var_comp != "log":
+            raise ValueError("streaming only supports var_comp='log'")
+
+        lmb_arr = _check_lmb(lmb)
+        c, n, logM2 = self._stats(lmb_arr)
+        ll = (lmb_arr - 1) * c - n / 2 * (logM2 - np.log(n))
+
+        if np.isscalar(lmb):
+            ll = ll[0]
+
+        return ll
+
+
+class YeoJohnsonStream:
+    # Yeo-Johnson statistics computed chunk by chunk, memory is O(chunk_size)
+
+    def __init__(self, source, chunk_size=_CHUNK_SIZE):
+        self.chunks = _Chunks(source, chunk_size)
+
+    def _stats(self, lmb):
+        # One pass over the data, positive and negative values are kept in
+        # separate buckets with moments of the transformed values of
+        # log1p(x) and log1p(-x) at lmb and 2 - lmb
+        c = 0.0
+        l0 = {"pos": None, "neg": None}
+        acc = {"pos": None, "neg": None}
+
+        for x in self.chunks:
+            pos = x >= 0  # binary mask
+            for key, l, lmb_k in [
+                ("pos", log1p(x[pos]), lmb),
+                ("neg", log1p(-x[~pos]), 2 - lmb),
+            ]:
+                if len(l) == 0:
+                    continue
+
+                c += np.sum(l) if key == "pos" else -np.sum(l)
+
+                # Reference point of this pass
+                l0[key] = np.mean(l) if l0[key] is None else l0[key]
+                acc[key] = _merge(
+                    acc[key], (len(l), *_chunk_moments(lmb_k, l, l0[key]))
+                )
+
+        if acc["pos"] is None and acc["neg"] is None:
+            raise ValueError("x must contain at least one non-NaN value.")
+
+        for key, lmb_k in [("pos", lmb), ("neg", 2 - lmb)]:
+            if acc[key] is not None:
+                acc[key] = _power_moments(lmb_k, l0[key], *acc[key])
+
+        return c, acc
+
+    def llf(self, lmb, var_comp="log"):
+        if var_comp != "log":
+            raise ValueError("streaming only supports var_comp='log'")
+
+        lmb_arr = _check_lmb(lmb)
+        c, acc = self._stats(lmb_arr)
+
+        if acc["neg"] is None:  # all positive
+            n, _, _, logM2 = acc["pos"]
+
+        elif acc["pos"] is None:  # all negative
+            n, _, _, logM2 = acc["neg"]
+
+        else:  # mixed positive and negative data, psi = -phi for x < 0
+            n_neg, logmean_neg, smean_neg, logM2_neg = acc["neg"]
+            n, _, _, logM2 = _log_merge(
+                *acc["pos"], n_neg, logmean_neg, -smean_neg, logM2_neg
+            )
+
+        logvar = logM2 - np.log(n)
+        ll = (lmb_arr - 1) * c - n / 2 * logvar
+
+        if np.isscalar(lmb):
+            ll = ll[0]
+
+        return ll
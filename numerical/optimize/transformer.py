@@ -0,0 +1,166 @@
+import numpy as np
+from sklearn.base import BaseEstimator, OneToOneFeatureMixin, TransformerMixin
+from sklearn.preprocessing import StandardScaler
+from sklearn.utils.validation import check_is_fitted, validate_data
+from .parallel import boxcox_mle_parallel, yeojohnson_mle_parallel
+
+
+def _expm1_div(lmb, logx):
+    # (exp(lmb * logx) - 1) / lmb, logx when lmb = 0
+    eq_0 = abs(lmb) < np.spacing(1.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(eq_0, logx, np.expm1(lmb * logx) / lmb)
+
+
+def _log1p_div(lmb, y):
+    # log(1 + lmb * y) / lmb, y when lmb = 0
+    eq_0 = abs(lmb) < np.spacing(1.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(eq_0, y, np.log1p(lmb * y) / lmb)
+
+
+def _boxcox(X, lmb, out):
+    # Box-Cox of every column at its own lmb, written to out
+    valid = ~np.isnan(X)
+    out[valid] = _expm1_div(lmb[valid], np.log(X[valid]))
+
+
+def _boxcox_inv(Y, lmb, out):
+    valid = ~np.isnan(Y)
+    out[valid] = np.exp(_log1p_div(lmb[valid], Y[valid]))
+
+
+def _yeojohnson(X, lmb, out):
+    # Yeo-Johnson of every column at its own lmb, written to out
+    pos, neg = X >= 0, X < 0  # NaNs are in neither
+    out[pos] = _expm1_div(lmb[pos], np.log1p(X[pos]))
+    out[neg] = -_expm1_div(2 - lmb[neg], np.log1p(-X[neg]))
+
+
+def _yeojohnson_inv(Y, lmb, out):
+    pos, neg = Y >= 0, Y < 0
+    out[pos] = np.expm1(_log1p_div(lmb[pos], Y[pos]))
+    out[neg] = -np.expm1(_log1p_div(2 - lmb[neg], -Y[neg]))
+
+
+class StablePowerTransformer(OneToOneFeatureMixin, TransformerMixin, BaseEstimator):
+    # Drop-in replacement of sklearn.preprocessing.PowerTransformer, lambdas are
+    # fitted on the log-space llf for all columns at once (in n_jobs processes).
+    # Output has the given dtype, copy=False transforms float input in place
+
+    def __init__(
+        self,
+        method="yeo-johnson",
+        *,
+        standardize=True,
+        copy=True,
+        n_jobs=None,
+        dtype=np.float64,
+    ):
+        self.method = method
+        self.standardize = standardize
+        self.copy = copy
+        self.n_jobs = n_jobs
+        self.dtype = dtype
+
+    def __sklearn_tags__(self):
+        tags = super().__sklearn_tags__()
+        tags.input_tags.allow_nan = True
+        return tags
+
+    def _check_input(self, X, reset, copy):
+        X = validate_data(
+            self,
+            X,
+            reset=reset,
+            copy=copy,
+            dtype=[np.float64, np.float32],
+            ensure_all_finite="allow-nan",
+        )
+        if self.method not in ("box-cox", "yeo-johnson"):
+            raise ValueError(
+                "'method' must be one of ('box-cox', 'yeo-johnson'), "
+                f"got {self.method} instead."
+            )
+        if self.method == "box-cox" and np.nanmin(X, initial=np.inf) <= 0:
+            raise ValueError(
+                "The Box-Cox transformation can only be applied to strictly "
+                "positive data"
+            )
+        return X
+
+    def _output(self, X):
+        # X itself when it can hold the output, otherwise a copy in dtype
+        if not self.copy and X.dtype == self.dtype and X.flags.writeable:
+            return X
+        return X.astype(self.dtype, copy=True)
+
+    def _transform(self, X):
+        out = self._output(X)
+        func = _boxcox if self.method == "box-cox" else _yeojohnson
+        func(X, np.broadcast_to(self.lambdas_, X.shape), out)
+        return out
+
+    def fit(self, X, y=None):
+        self._fit(X, force_transform=False)
+        return self
+
+    def fit_transform(self, X, y=None):
+        return self._fit(X, force_transform=True)
+
+    def _fit(self, X, force_transform):
+        X = self._check_input(X, reset=True, copy=False)
+
+        # Constant columns have a flat llf, they keep lmb = 1
+        ptp = np.nanmax(X, axis=0, initial=-np.inf) - np.nanmin(
+            X, axis=0, initial=np.inf
+        )
+        fit = ptp > 0
+        mle = (
+            boxcox_mle_parallel if self.method == "box-cox" else yeojohnson_mle_parallel
+        )
+
+        self.lambdas_ = np.ones(X.shape[1])
+        if np.all(fit):
+            self.lambdas_[:] = mle(X, n_jobs=self.n_jobs)
+        elif np.any(fit):
+            self.lambdas_[fit] = mle(X[:, fit], n_jobs=self.n_jobs)
+
+        if not (self.standardize or force_transform):
+            return None
+
+        # With copy=False, X is only written by fit_transform, fit leaves the
+        # caller's array as is and standardizes a copy
+        if not (force_transform or self.copy):
+            X = X.copy()
+        X = self._transform(X)
+        if self.standardize:
+            self._scaler = StandardScaler(copy=False)
+            X = self._scaler.fit_transform(X)
+        return X
+
+    def transform(self, X):
+        check_is_fitted(self)
+        X = self._check_input(X, reset=False, copy=False)
+        X = self._transform(X)
+        if self.standardize:
+            X = self._scaler.transform(X)
+        return X
+
+    def inverse_transform(self, X):
+        check_is_fitted(self)
+        X = validate_data(
+            self,
+            X,
+            reset=False,
+            dtype=[np.float64, np.float32],
+            ensure_all_finite="allow-nan",
+        )
+        out = self._output(X)
+        if self.standardize:
+            # Undo the scaling in float64 before the power inverse
+            X = self._scaler.inverse_transform(X.astype(np.float64, copy=True))
+
+        func = _boxcox_inv if self.method == "box-cox" else _yeojohnson_inv
+        func(X, np.broadcast_to(self.lambdas_, X.shape), out)
+        return out
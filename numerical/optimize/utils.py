@@ -1,15 +1,175 @@
 import numpy as np
 from scipy.special import logsumexp
 
+# Max number of elements in a (lambdas x samples) block
+_CHUNK_SIZE = 2**20
 
-def _log_mean(logx):
-    # compute log of mean of x from log(x)
-    return logsumexp(logx, axis=0) - np.log(len(logx))
 
+def _gen_lmb_slices(n_lmbs, n, chunk_size=_CHUNK_SIZE):
+    # Split lambdas into slices so each block holds about chunk_size elements
+    step = max(1, chunk_size // max(n, 1))
+    for start in range(0, n_lmbs, step):
+        yield slice(start, min(start + step, n_lmbs))
 
-def _log_var(logx):
-    # compute log of variance of x from log(x)
-    logmean = _log_mean(logx)
-    pij = np.full_like(logx, np.pi * 1j, dtype=np.complex128)
-    logxmu = logsumexp([logx, logmean + pij], axis=0)
-    return np.real(logsumexp(2 * logxmu, axis=0)) - np.log(len(logx))
+
+def _log_add(loga, logb, sa=1, sb=1, return_sign=True):
+    # compute log|sa * exp(loga) + sb * exp(logb)| and its sign
+    # using (log-magnitude, sign) pairs instead of complex logarithms
+    with np.errstate(invalid="ignore", divide="ignore"):
+        logm = np.maximum(loga, logb)
+        d = -np.abs(np.subtract(loga, logb))
+        same = np.multiply(sa, sb) >= 0
+
+        if np.all(same):
+            logc = logm + np.log1p(np.exp(d))
+        elif not np.any(same):
+            logc = logm + np.log(-np.expm1(d))
+        else:
+            logc = logm + np.where(same, np.log1p(np.exp(d)), np.log(-np.expm1(d)))
+
+    # both terms are zero
+    logc = np.where(np.isneginf(logm), -np.inf, logc)
+
+    if not return_sign:
+        return logc
+    return logc, np.where(np.greater_equal(loga, logb), sa, sb)
+
+
+def _log_dev_max(loga, logb, logmean, sa=1, sb=1, smean=1):
+    # log of the largest |x - mean| over values between sa * exp(loga) and
+    # sb * exp(logb): the largest deviation from the mean is at one of them
+    return np.maximum(
+        _log_add(loga, logmean, sa, -smean, return_sign=False),
+        _log_add(logb, logmean, sb, -smean, return_sign=False),
+    )
+
+
+def _logsumexp(a, amax, axis=-1, keepdims=False, b=None):
+    # logsumexp when the maximum of a along axis is already known,
+    # if b is given, return log|sum(b * exp(a))| and its sign
+    amax = np.where(np.isfinite(amax), amax, 0)
+    tmp = np.exp(a - amax)
+    if b is not None:
+        tmp *= b
+
+    s = np.sum(tmp, axis=axis, keepdims=True)
+    with np.errstate(divide="ignore"):
+        logsum = np.log(abs(s)) + amax
+
+    if not keepdims:
+        logsum, s = np.squeeze(logsum, axis), np.squeeze(s, axis)
+
+    if b is None:
+        return logsum
+    return logsum, np.sign(s)
+
+
+def _log_expm1(a):
+    # compute log|exp(a) - 1| without overflow, the sign is sign(a)
+    with np.errstate(divide="ignore"):
+        return np.maximum(a, 0) + np.log(-np.expm1(-np.abs(a)))
+
+
+def _add_logw(a, logw):
+    # Add log-weights to log-values, no weights when logw is None
+    return a if logw is None else a + logw
+
+
+def _log_count(logx, logw=None, axis=-1):
+    # log of the number of entries, or of the total weight
+    if logw is None:
+        return np.log(logx.shape[axis])
+    return logsumexp(np.broadcast_to(logw, logx.shape), axis=axis, keepdims=True)
+
+
+def _log_sum(logx, sign=None, axis=-1, keepdims=False, logw=None):
+    # compute log|sum(w * x)| and its sign from log|x|, sign(x) and log(w)
+    logx = _add_logw(logx, logw)
+    if sign is None:
+        logsum = logsumexp(logx, axis=axis, keepdims=keepdims)
+        return logsum, np.ones_like(logsum)
+    return logsumexp(logx, axis=axis, b=sign, keepdims=keepdims, return_sign=True)
+
+
+def _log_mean(logx, sign=None, axis=-1, keepdims=False, logw=None):
+    # compute log|mean(x)| and its sign from log|x| and sign(x),
+    # weighted by exp(logw)
+    logsum, smean = _log_sum(logx, sign, axis=axis, keepdims=True, logw=logw)
+    logmean = logsum - _log_count(logx, logw, axis=axis)
+    if not keepdims:
+        logmean, smean = np.squeeze(logmean, axis), np.squeeze(smean, axis)
+    return logmean, smean
+
+
+def _log_moments(logx, sign=None, axis=-1, logw=None):
+    # compute log|mean(x)|, sign of mean(x) and log of sum of (x-mean(x))^2,
+    # weighted by exp(logw)
+    logmean, smean = _log_mean(logx, sign, axis=axis, keepdims=True, logw=logw)
+    sx = 1 if sign is None else sign
+    logxmu = _log_add(logx, logmean, sx, -smean, return_sign=False)
+    logM2 = logsumexp(_add_logw(2 * logxmu, logw), axis=axis)
+    return np.squeeze(logmean, axis), np.squeeze(smean, axis), logM2
+
+
+def _log_var(logx, sign=None, axis=-1, logw=None):
+    # compute log of variance of x from log|x| and sign(x),
+    # weighted by exp(logw)
+    _, _, logM2 = _log_moments(logx, sign, axis=axis, logw=logw)
+    return logM2 - np.squeeze(_log_count(logx, logw, axis=axis))
+
+
+def _log_var_split(
+    logpos,
+    logneg,
+    logpos_max,
+    logneg_max,
+    n=None,
+    logw_pos=None,
+    logw_neg=None,
+    n_zero=0,
+):
+    # compute log of variance of the concatenation of exp(logpos) and -exp(logneg)
+    # along the last axis, given the maxima of logpos and logneg (keepdims).
+    # With log-weights logw_pos and logw_neg, n is the total weight.
+    # n_zero more zeros (or their weight) are added as one block. An array n
+    # holds one total per row
+    if n is None:
+        n = logpos.shape[-1] + logneg.shape[-1] + n_zero
+    logn = np.log(n)
+    logw_pos_max = 0.0 if logw_pos is None else np.max(logw_pos)
+    logw_neg_max = 0.0 if logw_neg is None else np.max(logw_neg)
+
+    logsum, smean = _log_add(
+        _logsumexp(
+            _add_logw(logpos, logw_pos), logpos_max + logw_pos_max, keepdims=True
+        ),
+        _logsumexp(
+            _add_logw(logneg, logw_neg), logneg_max + logw_neg_max, keepdims=True
+        ),
+        sb=-1,
+    )
+    logmean = logsum - np.expand_dims(logn, -1)
+
+    logxmu_max = _log_dev_max(logpos_max, logneg_max, logmean, 1, -1, smean)
+
+    logxmu_pos = _log_add(logpos, logmean, 1, -smean, return_sign=False)
+    logxmu_neg = _log_add(logneg, logmean, -1, -smean, return_sign=False)
+    logM2 = np.logaddexp(
+        _logsumexp(_add_logw(2 * logxmu_pos, logw_pos), 2 * logxmu_max + logw_pos_max),
+        _logsumexp(_add_logw(2 * logxmu_neg, logw_neg), 2 * logxmu_max + logw_neg_max),
+    )
+    if n_zero > 0:
+        logM2 = np.logaddexp(logM2, np.log(n_zero) + 2 * logmean[..., 0])
+    return logM2 - logn
+
+
+def _log_merge(n_1, logmean_1, smean_1, logM2_1, n_2, logmean_2, smean_2, logM2_2):
+    # Pairwise (Chan et al.) combination of the count, log|mean|, sign of mean
+    # and log of sum of squared deviations of two disjoint sets
+    n = n_1 + n_2
+    logdelta, sdelta = _log_add(logmean_2, logmean_1, smean_2, -smean_1)
+    logmean, smean = _log_add(logmean_1, logdelta + np.log(n_2 / n), smean_1, sdelta)
+    logM2 = np.logaddexp(
+        np.logaddexp(logM2_1, logM2_2), 2 * logdelta + np.log(n_1 * n_2 / n)
+    )
+    return n, logmean, smean, logM2
@@ -10,7 +10,7 @@ def main(x, lb, ub, img_name):
     fig, ax = plt.subplots(figsize=(3, 3))
 
     lmbs = np.linspace(lb, ub, 400)
-    nll = [-boxcox_llf(l, x) for l in lmbs]
+    nll = -boxcox_llf(lmbs, x)
     ax.plot(lmbs, nll, color="C0", label="NLL")
 
     lmb_opt = boxcox_mle(x)
@@ -0,0 +1,188 @@
+import time
+import numpy as np
+import pytest
+from numerical.optimize import boxcox_llf, boxcox_mle, yeojohnson_llf, yeojohnson_mle
+from federated.core import (
+    Compression,
+    EdgeAggregator,
+    FedPowerClient,
+    FedPowerMultiClient,
+    FedPowerMultiServer,
+    FedPowerServer,
+    LocalNetwork,
+    get_backend,
+)
+
+BACKENDS = ["serial", "thread", "process", "asyncio"]
+LMB = np.linspace(-2, 2, 9)
+
+
+def _parts(power="yeojohnson", n_clients=8):
+    rng = np.random.default_rng(0)
+    x = rng.lognormal(0.5, 0.8, 2000)
+    if power == "yeojohnson":
+        x = np.where(rng.random(2000) < 0.1, 0, x - 2)
+    return x, np.array_split(x, n_clients)
+
+
+def _clients(power="yeojohnson", n_clients=8):
+    x, parts = _parts(power, n_clients)
+    return x, [FedPowerClient(power, p) for p in parts]
+
+
+class _Slow(FedPowerClient):
+    # A straggler, later than any deadline below
+    def llf(self, *args, **kwargs):
+        time.sleep(0.5)
+        return super().llf(*args, **kwargs)
+
+
+@pytest.mark.parametrize("power", ["boxcox", "yeojohnson"])
+@pytest.mark.parametrize("var_comp", ["pairwise", "naive"])
+def test_llf_matches_centralized(power, var_comp):
+    x, clients = _clients(power)
+    llf = boxcox_llf if power == "boxcox" else yeojohnson_llf
+    server = FedPowerServer(power, clients)
+    np.testing.assert_allclose(server.llf(LMB, var_comp), llf(LMB, x), rtol=1e-10)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_backends_match_serial(backend):
+    x, clients = _clients()
+    expected = FedPowerServer("yeojohnson", clients).mle()
+    with get_backend(backend, 3) as b:
+        server = FedPowerServer("yeojohnson", clients, b)
+        assert server.mle() == expected
+    assert expected == pytest.approx(yeojohnson_mle(x), abs=1e-6)
+
+
+@pytest.mark.parametrize("optimize", ["grid", "speculative", "newton"])
+def test_optimizers_match_centralized(optimize):
+    x, clients = _clients()
+    lmb = FedPowerServer("yeojohnson", clients).mle(optimize=optimize, n_points=401)
+    tol = 1e-2 if optimize == "grid" else 1e-6
+    assert lmb == pytest.approx(yeojohnson_mle(x), abs=tol)
+
+
+def test_sketch_within_its_bound():
+    x, clients = _clients()
+    server = FedPowerServer("yeojohnson", clients)
+    lmb = server.sketch_mle()
+    assert abs(lmb - yeojohnson_mle(x)) <= server.lmb_error
+    assert len(server.trace) == 1
+
+    refined = FedPowerServer("yeojohnson", clients).sketch_mle(refine=True)
+    assert abs(refined - yeojohnson_mle(x)) <= abs(lmb - yeojohnson_mle(x))
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_straggler_is_excluded(backend):
+    _, parts = _parts("boxcox", 10)
+    clients = [
+        (_Slow if i == 1 else FedPowerClient)("boxcox", p) for i, p in enumerate(parts)
+    ]
+    with get_backend(backend, 3) as b:
+        server = FedPowerServer("boxcox", clients, b, deadline=0.2, quorum=0.5)
+        lmb = server.mle()
+
+    # Only the straggler is late, the fit is the one on the others
+    assert server.participants.tolist() == [0, *range(2, 10)]
+    others = [parts[i] for i in server.participants]
+    expected = FedPowerServer("boxcox", [FedPowerClient("boxcox", p) for p in others])
+    assert lmb == expected.mle()
+    assert lmb == pytest.approx(boxcox_mle(np.concatenate(others)), abs=1e-6)
+
+
+def test_quorum_not_met():
+    _, parts = _parts("boxcox", 4)
+    clients = [_Slow("boxcox", p) for p in parts[:2]] + [
+        FedPowerClient("boxcox", p) for p in parts[2:]
+    ]
+    server = FedPowerServer("boxcox", clients, "thread", deadline=0.2, quorum=0.75)
+    with pytest.raises(RuntimeError, match="quorum is 3"):
+        server.mle()
+    server.backend.close()
+
+
+@pytest.mark.parametrize("quorum", [0, -0.5, 1.5, 2])
+def test_quorum_must_be_a_fraction(quorum):
+    with pytest.raises(ValueError, match="quorum"):
+        FedPowerServer("boxcox", _clients("boxcox")[1], quorum=quorum)
+
+
+@pytest.mark.parametrize("var_comp", ["pairwise", "naive"])
+def test_edges_match_direct(var_comp):
+    _, clients = _clients(n_clients=24)
+    direct = FedPowerServer("yeojohnson", clients).llf(LMB, var_comp)
+
+    edges = [EdgeAggregator("yeojohnson", clients[i : i + 6]) for i in range(0, 24, 6)]
+    np.testing.assert_allclose(
+        FedPowerServer("yeojohnson", edges).llf(LMB, var_comp), direct, rtol=1e-10
+    )
+    two_levels = [EdgeAggregator("yeojohnson", edges[:2]), edges[2], edges[3]]
+    np.testing.assert_allclose(
+        FedPowerServer("yeojohnson", two_levels).llf(LMB, var_comp),
+        direct,
+        rtol=1e-10,
+    )
+
+
+def test_edges_reject_compression():
+    _, clients = _clients()
+    edge = EdgeAggregator("yeojohnson", clients)
+    with pytest.raises(ValueError, match="uncompressed"):
+        edge.llf(LMB, compression=Compression())
+
+
+@pytest.mark.parametrize("precision", ["float32", "bfloat16"])
+@pytest.mark.parametrize("var_comp", ["pairwise", "naive"])
+def test_compression_within_its_bound(precision, var_comp):
+    _, clients = _clients()
+    expected = FedPowerServer("yeojohnson", clients).mle(var_comp=var_comp)
+    server = FedPowerServer("yeojohnson", clients, compression=Compression(precision))
+    lmb = server.mle(var_comp=var_comp)
+    assert abs(lmb - expected) <= server.lmb_error
+    assert all(record["aggregate_time"] >= 0 for record in server.trace)
+
+
+def test_newton_rejects_compression():
+    _, clients = _clients()
+    server = FedPowerServer("yeojohnson", clients, compression=Compression())
+    with pytest.raises(ValueError, match="compression"):
+        server.mle(optimize="newton")
+
+
+def test_unknown_optimize():
+    with pytest.raises(ValueError, match="optimize must be one of"):
+        FedPowerServer("boxcox", _clients("boxcox")[1]).mle(optimize="bisect")
+
+
+def test_multi_server_matches_single():
+    rng = np.random.default_rng(0)
+    X = np.column_stack(
+        [rng.lognormal(size=1000), rng.normal(size=1000), -rng.exponential(size=1000)]
+    )
+    parts = np.array_split(X, 6)
+    lmb = FedPowerMultiServer(
+        "yeojohnson", [FedPowerMultiClient("yeojohnson", p) for p in parts]
+    ).mle()
+    expected = [
+        FedPowerServer(
+            "yeojohnson", [FedPowerClient("yeojohnson", p[:, j]) for p in parts]
+        ).mle()
+        for j in range(X.shape[1])
+    ]
+    np.testing.assert_allclose(lmb, expected, rtol=1e-7)
+
+
+@pytest.mark.parametrize("family", ["unix", "tcp"])
+@pytest.mark.parametrize("backend", ["serial", "asyncio"])
+def test_transport_matches_local(family, backend):
+    x, parts = _parts(n_clients=4)
+    expected = FedPowerServer(
+        "yeojohnson", [FedPowerClient("yeojohnson", p) for p in parts]
+    ).mle()
+    with LocalNetwork("yeojohnson", parts, family) as net:
+        with get_backend(backend) as b:
+            assert FedPowerServer("yeojohnson", net.clients, b).mle() == expected
+        assert net.bytes_received > 0
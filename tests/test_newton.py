@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from numerical.optimize import yeojohnson_mle
+from numerical.optimize.newton import newton_max
+
+
+def _tiny():
+    # log1p(x) = x and x**2 underflows, the derivatives are NaN everywhere
+    return np.random.default_rng(0).uniform(1e-300, 1e-290, 1000)
+
+
+def test_unusable_derivative_falls_back_to_brent():
+    x = -_tiny()
+    with np.errstate(all="ignore"):
+        assert yeojohnson_mle(x, optimize="newton") == yeojohnson_mle(x)
+
+
+def _outcome(x, **kwargs):
+    # The estimate, or the type of the error raised
+    try:
+        with np.errstate(all="ignore"):
+            return yeojohnson_mle(x, **kwargs)
+    except Exception as e:
+        return type(e)
+
+
+def test_unusable_derivative_is_not_returned_as_converged():
+    # The llf is flat, Newton must not return its unevaluated start 0.0
+    x = _tiny()
+    x = x - np.median(x)
+    assert _outcome(x, optimize="newton") == _outcome(x)
+
+
+def test_unusable_derivative_without_func():
+    with pytest.raises(ValueError):
+        newton_max(lambda x: (np.nan, np.nan))
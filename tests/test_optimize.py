@@ -0,0 +1,154 @@
+import numpy as np
+import pytest
+from scipy import optimize
+from numerical.optimize import (
+    BoxCoxOnline,
+    BoxCoxStream,
+    StablePowerTransformer,
+    YeoJohnsonData,
+    YeoJohnsonOnline,
+    YeoJohnsonStream,
+    boxcox_llf,
+    boxcox_mle,
+    boxcox_mle_parallel,
+    boxcox_mle_batch,
+    power_expsearch,
+    power_kary_expsearch,
+    yeojohnson_llf,
+    yeojohnson_mle,
+    yeojohnson_mle_batch,
+    yeojohnson_mle_parallel,
+)
+from numerical.optimize.batch import batch_brent
+
+LMB = np.linspace(-3, 3, 13)
+
+
+def _rng():
+    return np.random.default_rng(1)
+
+
+def test_batch_brent_matches_scipy():
+    # Each problem takes the same steps as scipy.optimize.brent
+    centers = np.array([-1.5, 0.0, 0.3, 2.0, 7.0])
+    scales = np.array([1.0, 0.1, 5.0, 2.0, 0.5])
+
+    def func(x, idx):
+        return scales[idx] * (x - centers[idx]) ** 2 + np.cos(x)
+
+    x = batch_brent(func, (np.full(5, -2.0), np.full(5, 2.0)))
+    expected = [
+        optimize.brent(lambda t: func(t, i), brack=(-2, 2)) for i in range(len(centers))
+    ]
+    np.testing.assert_array_equal(x, expected)
+
+
+def test_stream_matches_prepared(tmp_path):
+    x = _rng().lognormal(0.5, 1.0, 5000)
+    y = _rng().normal(0.5, 3.0, 5000)
+    path = tmp_path / "y.npy"
+    np.save(path, y)
+
+    np.testing.assert_allclose(
+        BoxCoxStream(x, chunk_size=700).llf(LMB), boxcox_llf(LMB, x), rtol=1e-10
+    )
+    for source in (y, str(path), lambda: np.array_split(y, 9)):
+        np.testing.assert_allclose(
+            YeoJohnsonStream(source, chunk_size=700).llf(LMB),
+            yeojohnson_llf(LMB, y),
+            rtol=1e-10,
+        )
+    assert yeojohnson_mle(YeoJohnsonStream(y, 700)) == pytest.approx(
+        yeojohnson_mle(y), abs=1e-6
+    )
+
+
+def test_stream_single_use_iterator():
+    stream = YeoJohnsonStream(iter(np.array_split(_rng().normal(size=100), 3)))
+    with pytest.raises(ValueError, match="single-use"):
+        yeojohnson_mle(stream)
+
+
+def test_newton_on_stream_raises():
+    with pytest.raises(ValueError, match="not a stream"):
+        boxcox_mle(BoxCoxStream(_rng().lognormal(size=100)), optimize="newton")
+    with pytest.raises(ValueError, match="not a stream"):
+        yeojohnson_mle(YeoJohnsonStream(_rng().normal(size=100)), optimize="newton")
+
+
+@pytest.mark.parametrize(
+    "cls, mle, x",
+    [
+        (BoxCoxOnline, boxcox_mle, np.random.default_rng(2).gamma(2.0, 3.0, 20000)),
+        (
+            YeoJohnsonOnline,
+            yeojohnson_mle,
+            np.random.default_rng(2).normal(1, 3, 20000),
+        ),
+    ],
+)
+def test_online_matches_mle(cls, mle, x):
+    fit = cls()
+    for batch in np.array_split(x, 20):
+        fit.partial_fit(batch)
+    assert fit.n == len(x)
+    assert fit.lmb == pytest.approx(mle(x), abs=1e-3)
+
+
+@pytest.mark.parametrize("power", ["boxcox", "yeojohnson"])
+def test_expsearch_matches_mle(power):
+    x = _rng().lognormal(0.5, 1.0, 2000)
+    if power == "yeojohnson":
+        x -= 2
+    mle = boxcox_mle if power == "boxcox" else yeojohnson_mle
+    expected = mle(x, brack=(-5, 5))
+
+    assert power_expsearch(power, x) == pytest.approx(expected, abs=1e-6)
+    for k in (1, 4, 7):
+        assert power_kary_expsearch(power, x, k=k) == pytest.approx(expected, abs=1e-6)
+
+
+def test_kary_expsearch_takes_fewer_rounds():
+    x = _rng().lognormal(0.5, 1.0, 2000)
+    _, rounds_1 = power_kary_expsearch("boxcox", x, k=1, full_output=1)
+    _, rounds_7 = power_kary_expsearch("boxcox", x, k=7, full_output=1)
+    assert rounds_7 < rounds_1
+
+
+def test_parallel_matches_batch():
+    X = _rng().lognormal(size=(200, 12))
+    np.testing.assert_array_equal(boxcox_mle_parallel(X, n_jobs=2), boxcox_mle_batch(X))
+    np.testing.assert_array_equal(
+        yeojohnson_mle_parallel(X - 1, n_jobs=2), yeojohnson_mle_batch(X - 1)
+    )
+
+
+def test_transformer_matches_sklearn():
+    preprocessing = pytest.importorskip("sklearn.preprocessing")
+    X = _rng().lognormal(size=(300, 4))
+    for method in ("box-cox", "yeo-johnson"):
+        ours = StablePowerTransformer(method).fit(X)
+        theirs = preprocessing.PowerTransformer(method=method).fit(X)
+        np.testing.assert_allclose(ours.lambdas_, theirs.lambdas_, atol=1e-6)
+        np.testing.assert_allclose(
+            ours.transform(X), theirs.transform(X), rtol=1e-5, atol=1e-8
+        )
+        np.testing.assert_allclose(
+            ours.inverse_transform(ours.transform(X)), X, rtol=1e-10
+        )
+
+
+def test_transformer_no_copy_fit_keeps_input():
+    X = _rng().normal(size=(100, 3))
+    X_orig = X.copy()
+    StablePowerTransformer(copy=False).fit(X)
+    np.testing.assert_array_equal(X, X_orig)
+
+
+def test_weighted_newton_matches_brent():
+    x = _rng().normal(0.5, 3.0, 500)
+    w = _rng().random(500)
+    data = YeoJohnsonData(x, sample_weight=w)
+    assert yeojohnson_mle(data, optimize="newton") == pytest.approx(
+        yeojohnson_mle(data), abs=1e-6
+    )
@@ -0,0 +1,144 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp_sparse
+from scipy import stats
+from numerical.optimize import (
+    BoxCoxColumns,
+    BoxCoxData,
+    YeoJohnsonColumns,
+    YeoJohnsonData,
+    boxcox_llf,
+    boxcox_mle,
+    boxcox_mle_batch,
+    yeojohnson_llf,
+    yeojohnson_mle,
+    yeojohnson_mle_batch,
+)
+
+LMB = np.linspace(-3, 3, 13)
+
+
+def _rng():
+    return np.random.default_rng(0)
+
+
+def _positive():
+    return _rng().lognormal(1.0, 0.8, 500)
+
+
+def _mixed():
+    return _rng().normal(0.5, 3.0, 500)
+
+
+def _close(a, b):
+    np.testing.assert_allclose(a, b, rtol=1e-10, atol=1e-8)
+
+
+def test_boxcox_llf_matches_scipy():
+    x = _positive()
+    _close(BoxCoxData(x).llf(LMB), [stats.boxcox_llf(l, x) for l in LMB])
+    _close(boxcox_llf(0.3, x), stats.boxcox_llf(0.3, x))
+
+
+@pytest.mark.parametrize("sign", [1, -1, 0])
+def test_yeojohnson_llf_matches_scipy(sign):
+    x = abs(_mixed()) * sign if sign else _mixed()
+    if sign == 0:
+        x[::7] = 0
+    _close(YeoJohnsonData(x).llf(LMB), [stats.yeojohnson_llf(l, x) for l in LMB])
+
+
+def test_scalar_lmb_gives_scalar():
+    assert np.ndim(BoxCoxData(_positive()).llf(0.5)) == 0
+    assert np.ndim(YeoJohnsonData(_mixed()).llf(0.5)) == 0
+
+
+def test_counts_equal_repeats():
+    x = _rng().integers(-5, 20, 1000).astype(np.float64)
+    _close(
+        YeoJohnsonData(x, compress=True).llf(LMB),
+        YeoJohnsonData(x, compress=False).llf(LMB),
+    )
+
+
+def test_integer_weights_equal_repeats():
+    x = _positive()[:100]
+    w = _rng().integers(1, 4, 100)
+    _close(
+        boxcox_llf(LMB, x, sample_weight=w),
+        [stats.boxcox_llf(l, np.repeat(x, w)) for l in LMB],
+    )
+    _close(
+        yeojohnson_llf(LMB, x - 3, sample_weight=w),
+        [stats.yeojohnson_llf(l, np.repeat(x - 3, w)) for l in LMB],
+    )
+
+
+def test_mle_matches_scipy():
+    x, y = _positive(), _mixed()
+    assert boxcox_mle(x) == pytest.approx(
+        stats.boxcox_normmax(x, method="mle"), abs=1e-6
+    )
+    assert yeojohnson_mle(y) == pytest.approx(stats.yeojohnson_normmax(y), abs=1e-6)
+
+
+def test_newton_matches_brent():
+    x, y = _positive(), _mixed()
+    assert boxcox_mle(x, optimize="newton") == pytest.approx(boxcox_mle(x), abs=1e-6)
+    assert yeojohnson_mle(y, optimize="newton") == pytest.approx(
+        yeojohnson_mle(y), abs=1e-6
+    )
+
+
+def test_sparse_yeojohnson_equals_dense():
+    x = np.where(_rng().random(500) < 0.7, 0, _mixed())
+    _close(
+        YeoJohnsonData(sp_sparse.csr_array(x[None, :])).llf(LMB),
+        YeoJohnsonData(x).llf(LMB),
+    )
+
+
+def test_sparse_boxcox():
+    x = _positive()
+    _close(BoxCoxData(sp_sparse.csr_array(x[None, :])).llf(LMB), BoxCoxData(x).llf(LMB))
+
+    x[3] = 0
+    with pytest.raises(ValueError, match="strictly positive"):
+        BoxCoxData(sp_sparse.csr_array(x[None, :]))
+
+
+def _matrix():
+    rng = _rng()
+    X = rng.normal(size=(300, 5)) * [1, 10, 1e3, 1e-3, 1] + [0, 0, 0, 0, 5]
+    X[rng.random(X.shape) < 0.05] = np.nan
+    return X
+
+
+def _column_llf(llf, X, l):
+    return [llf(l, X[~np.isnan(X[:, k]), k]) for k in range(X.shape[1])]
+
+
+def test_columns_match_scipy():
+    X = _matrix()
+    for l in (-2.0, 0.0, 0.5, 3.0):
+        lmb = np.full(X.shape[1], l)
+        _close(YeoJohnsonColumns(X).llf(lmb), _column_llf(stats.yeojohnson_llf, X, l))
+        _close(
+            BoxCoxColumns(abs(X) + 1).llf(lmb),
+            _column_llf(stats.boxcox_llf, abs(X) + 1, l),
+        )
+
+
+def test_mle_batch_matches_mle():
+    # Within the tolerance of Brent's method
+    X = _matrix()
+    np.testing.assert_allclose(
+        yeojohnson_mle_batch(X),
+        [yeojohnson_mle(X[:, k][~np.isnan(X[:, k])]) for k in range(X.shape[1])],
+        rtol=1e-7,
+    )
+    np.testing.assert_allclose(
+        boxcox_mle_batch(abs(X) + 1),
+        [boxcox_mle(abs(X[:, k][~np.isnan(X[:, k])]) + 1) for k in range(X.shape[1])],
+        rtol=1e-7,
+    )
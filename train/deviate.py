@@ -4,13 +4,13 @@ from sklearn.discriminant_analysis import LinearDiscriminantAnalysis
 from sklearn.feature_selection import SelectKBest, mutual_info_classif
 from sklearn.metrics import roc_auc_score
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler, PowerTransformer
+from sklearn.preprocessing import StandardScaler
 from argparse import ArgumentParser
 from pathlib import Path
 import numpy as np
 import matplotlib.pyplot as plt
 from dataloader import load_data
-from numerical.optimize import yeojohnson_mle
+from numerical.optimize import yeojohnson_mle, StablePowerTransformer
 
 
 def main(dataset, feature, model, x_train, x_test, y_train, y_test, eps, n_points):
@@ -26,7 +26,7 @@ def main(dataset, feature, model, x_train, x_test, y_train, y_test, eps, n_point
     lmb_opt = yeojohnson_mle(x_train)
     lmbs = np.linspace(lmb_opt * (1 - eps), lmb_opt * (1 + eps), n_points)
 
-    power = PowerTransformer(standardize=False)
+    power = StablePowerTransformer(standardize=False)
     std = StandardScaler()
 
     auc = []
@@ -5,11 +5,12 @@ from sklearn.linear_model import LogisticRegression
 from sklearn.discriminant_analysis import LinearDiscriminantAnalysis
 from sklearn.metrics import RocCurveDisplay
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler, PowerTransformer
+from sklearn.preprocessing import StandardScaler
 from argparse import ArgumentParser
 from pathlib import Path
 import matplotlib.pyplot as plt
 from dataloader import load_data
+from numerical.optimize import StablePowerTransformer
 
 
 def main(dataset, model, X_train, X_test, y_train, y_test):
@@ -23,7 +24,7 @@ def main(dataset, model, X_train, X_test, y_train, y_test):
         clf = XGBClassifier()
 
     # Power Transform
-    power = PowerTransformer()
+    power = StablePowerTransformer()
     X_train_power = power.fit_transform(X_train)
     X_test_power = power.transform(X_test)
     clf.fit(X_train_power, y_train)